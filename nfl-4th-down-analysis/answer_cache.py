@@ -0,0 +1,232 @@
+"""
+Answer Cache
+============
+SQLite-backed LRU + TTL cache for AI answers, shared by every session
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "answers.sqlite")
+
+
+# ============================================
+# KEYS
+# ============================================
+def normalize_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    question = re.sub(r"\s+", " ", str(question)).strip().lower()
+    return question.rstrip("?!. ")
+
+
+def data_fingerprint(df):
+    """Stable hash of a DataFrame's columns and values"""
+    h = hashlib.sha256()
+    h.update("|".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def make_key(question, fingerprint, model):
+    raw = f"{normalize_question(question)}\x1f{fingerprint}\x1f{model}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ============================================
+# CACHE
+# ============================================
+class AnswerCache:
+    """Persistent answer cache with LRU eviction and a time-to-live; misses fall through to an optional shared tier"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=1000, ttl_seconds=7 * 24 * 3600, shared=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False) if path == ":memory:" else None
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    question TEXT,
+                    fingerprint TEXT,
+                    model TEXT,
+                    answer TEXT,
+                    created_at REAL,
+                    last_used REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS asked (
+                    normalized TEXT PRIMARY KEY,
+                    question TEXT,
+                    times INTEGER,
+                    last_asked REAL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    def _connect(self):
+        if self._memory_conn is not None:
+            return _Borrowed(self._memory_conn)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _Owned(conn)
+
+    def get(self, question, fingerprint, *models, record=True):
+        """Return the first cached answer for any of the models, or None.
+
+        With record=False the hit / miss counters are left alone, for callers that try several
+        lookups for one question and then call record() once.
+        """
+        keys = [make_key(question, fingerprint, m) for m in models]
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, answer, created_at FROM answers WHERE key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+            found = {key: (answer, created_at) for key, answer, created_at in rows}
+            answer = None
+            for key in keys:
+                if key not in found:
+                    continue
+                cached, created_at = found[key]
+                if now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    continue
+                conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+                answer = cached
+                break
+            if answer is None:
+                answer = self._shared_get(conn, keys, question, fingerprint, models, now)
+            if record:
+                self._record(conn, answer is not None)
+        return answer
+
+    def record(self, hit):
+        """Count one lookup as a hit or a miss"""
+        with self._lock, self._connect() as conn:
+            self._record(conn, hit)
+
+    def _record(self, conn, hit):
+        conn.execute("UPDATE stats SET value = value + 1 WHERE name = ?", ("hits" if hit else "misses",))
+
+    def _shared_get(self, conn, keys, question, fingerprint, models, now):
+        """First answer another replica stored, copied into the local cache"""
+        if self.shared is None:
+            return None
+        for key, model in zip(keys, models):
+            answer = self.shared.get_answer(key)
+            if answer is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, normalize_question(question), fingerprint, model, answer, now, now),
+                )
+                return answer
+        return None
+
+    def has(self, question, fingerprint, *models):
+        """True if any of the models has a live answer; unlike get, touches neither stats nor LRU order"""
+        keys = [make_key(question, fingerprint, m) for m in models]
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM answers WHERE key IN ({','.join('?' * len(keys))}) AND created_at >= ? LIMIT 1",
+                [*keys, time.time() - self.ttl_seconds],
+            ).fetchone()
+        if row is None and self.shared is not None:
+            return any(self.shared.get_answer(key) is not None for key in keys)
+        return row is not None
+
+    def put(self, question, fingerprint, model, answer):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (make_key(question, fingerprint, model), normalize_question(question),
+                 fingerprint, model, answer, now, now),
+            )
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+        if self.shared is not None:
+            self.shared.put_answer(make_key(question, fingerprint, model), answer)
+
+    # --------------------------------------------
+    # Query log (feeds cache warm-up)
+    # --------------------------------------------
+    def log_question(self, question):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO asked VALUES (?, ?, 1, ?)
+                ON CONFLICT(normalized) DO UPDATE SET
+                    question = excluded.question, times = times + 1, last_asked = excluded.last_asked
+            """, (normalize_question(question), str(question).strip(), time.time()))
+
+    def top_questions(self, n=20, min_times=2):
+        """Most-asked questions, most frequent first"""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question FROM asked WHERE times >= ? ORDER BY times DESC, last_asked DESC LIMIT ?",
+                (min_times, n),
+            ).fetchall()
+        return [question for (question,) in rows]
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            counts = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        total = counts["hits"] + counts["misses"]
+        return {
+            "hits": counts["hits"],
+            "misses": counts["misses"],
+            "entries": entries,
+            "hit_rate": counts["hits"] / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM answers")
+            conn.execute("UPDATE stats SET value = 0")
+
+
+class _Owned:
+    """Commit and close a connection opened for one operation"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        with closing(self.conn):
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+
+
+class _Borrowed(_Owned):
+    """Commit on a shared in-memory connection without closing it"""
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
@@ -0,0 +1,104 @@
+"""
+Connection Pool Load Test
+=========================
+Throughput of N concurrent sessions against a local stand-in connector.
+
+    python bench_pool.py --sessions 1 2 4 8 --queries 20 --latency 0.05
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from snowflake_pool import ConnectionPool
+
+
+class FakeConnection:
+    """Stand-in for snowflake.connector: each query holds the connection for `latency` seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self._busy = threading.Lock()
+        self._closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def is_closed(self):
+        return self._closed
+
+    def close(self):
+        self._closed = True
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        # A real connection serializes statements, so concurrent cursors queue here
+        with self.conn._busy:
+            time.sleep(self.conn.latency)
+
+    def fetchone(self):
+        return ("ok",)
+
+    def close(self):
+        pass
+
+
+def run_shared(sessions, queries, latency):
+    """Today's behaviour: every session shares one connection"""
+    conn = FakeConnection(latency)
+
+    def session():
+        for _ in range(queries):
+            cursor = conn.cursor()
+            cursor.execute("SELECT SNOWFLAKE.CORTEX.COMPLETE(...)")
+            cursor.fetchone()
+
+    return _timed(session, sessions, queries)
+
+
+def run_pooled(sessions, queries, latency, pool_size):
+    pool = ConnectionPool(connect=lambda: FakeConnection(latency), max_size=pool_size)
+
+    def query(conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT SNOWFLAKE.CORTEX.COMPLETE(...)")
+        return cursor.fetchone()
+
+    def session():
+        for _ in range(queries):
+            pool.run(query)
+
+    return _timed(session, sessions, queries)
+
+
+def _timed(session, sessions, queries):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        for future in [executor.submit(session) for _ in range(sessions)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return sessions * queries / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} {'shared q/s':>11} {'pooled q/s':>11} {'speedup':>8}")
+    for n in args.sessions:
+        shared = run_shared(n, args.queries, args.latency)
+        pooled = run_pooled(n, args.queries, args.latency, args.pool_size)
+        print(f"{n:>8} {shared:>11.1f} {pooled:>11.1f} {pooled / shared:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
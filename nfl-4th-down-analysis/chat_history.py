@@ -0,0 +1,96 @@
+"""
+Chat History
+============
+Bounded chat log: a rendered window, paged older turns, and token-budgeted model context
+"""
+
+import re
+
+from context_builder import estimate_tokens
+
+SUMMARY_WORDS = 30
+
+
+def summarize_message(message):
+    """One line per message: role and the first sentence, capped at SUMMARY_WORDS words"""
+    text = " ".join(message["content"].split())
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    words = first.split()
+    if len(words) > SUMMARY_WORDS:
+        first = " ".join(words[:SUMMARY_WORDS]) + "..."
+    return f"{message['role'].title()}: {first}"
+
+
+class ChatHistory:
+    """Messages oldest first; turns that fall out of the context budget are folded into a rolling summary"""
+
+    def __init__(self, window=6, context_budget=800, summary_budget=250, max_messages=200):
+        self.window = window
+        self.context_budget = context_budget
+        self.summary_budget = summary_budget
+        self.max_messages = max_messages
+        self.messages = []
+        self.summary_lines = []
+        # Absolute message counts: discarded from storage / folded into the summary
+        self.dropped = 0
+        self.summarized = 0
+
+    def __len__(self):
+        return self.dropped + len(self.messages)
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+        # Only messages already in the summary are ever discarded
+        excess = min(len(self.messages) - self.max_messages, self.summarized - self.dropped)
+        if excess > 0:
+            del self.messages[:excess]
+            self.dropped += excess
+
+    # --------------------------------------------
+    # Rendering
+    # --------------------------------------------
+    def recent(self):
+        """The newest `window` messages, rendered in full"""
+        return self.messages[-self.window:]
+
+    def older_count(self):
+        return max(len(self.messages) - self.window, 0)
+
+    def older_page(self, page, page_size=10):
+        """Page 0 is the stretch just before the recent window; higher pages go further back"""
+        end = self.older_count() - page * page_size
+        return self.messages[max(end - page_size, 0):max(end, 0)]
+
+    # --------------------------------------------
+    # Model context
+    # --------------------------------------------
+    def _fold(self, upto):
+        """Summarize messages up to absolute index `upto`, keeping the summary within budget"""
+        for message in self.messages[self.summarized - self.dropped:upto - self.dropped]:
+            self.summary_lines.append(summarize_message(message))
+        self.summarized = max(self.summarized, upto)
+        while len(self.summary_lines) > 1 and estimate_tokens("\n".join(self.summary_lines)) > self.summary_budget:
+            self.summary_lines.pop(0)
+
+    def context(self):
+        """Prior conversation for the prompt: newest turns verbatim within budget, older ones summarized"""
+        start = len(self.messages)
+        used = 0
+        while start > self.summarized - self.dropped:
+            message = self.messages[start - 1]
+            tokens = estimate_tokens(message["content"])
+            if used + tokens > self.context_budget:
+                break
+            used += tokens
+            start -= 1
+        self._fold(self.dropped + start)
+
+        parts = []
+        if self.summary_lines:
+            parts.append("Earlier in this conversation (summary):\n" + "\n".join(self.summary_lines))
+        turns = self.messages[start:]
+        if turns:
+            parts.append("Recent conversation:\n" + "\n".join(
+                f"{message['role'].title()}: {message['content']}" for message in turns
+            ))
+        return "\n\n".join(parts)
@@ -0,0 +1,175 @@
+"""
+Request Coalescing
+==================
+Single-flight sharing of identical in-flight requests, and backend throttling
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ThrottleTimeout(Exception):
+    """Waited too long in the queue for a backend slot"""
+
+
+class FlightInterrupted(Exception):
+    """The shared call stopped (or went quiet) before it finished, so its output is incomplete"""
+
+
+# ============================================
+# SINGLE FLIGHT
+# ============================================
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one backend call"""
+
+    def __init__(self, wait_timeout=120):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                return flight, True
+            flight.followers += 1
+            self.followers += 1
+            return flight, False
+
+    def _finish(self, key, flight, error=None):
+        with self._lock:
+            self._flights.pop(key, None)
+        with flight.cond:
+            flight.done = True
+            flight.error = error
+            flight.cond.notify_all()
+
+    def stream(self, key, make_stream):
+        """Leader iterates make_stream() and broadcasts each chunk; followers replay as it arrives.
+
+        If the leader stops early (rerun, stop, closed generator), a follower that has not received
+        anything yet takes over with its own make_stream(); one that has raises FlightInterrupted.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            error = None
+            try:
+                for chunk in make_stream():
+                    with flight.cond:
+                        flight.chunks.append(chunk)
+                        flight.cond.notify_all()
+                    yield chunk
+            except Exception as e:
+                error = e
+                raise
+            except BaseException:
+                error = FlightInterrupted("the shared request stopped before it finished")
+                raise
+            finally:
+                self._finish(key, flight, error)
+            return
+
+        seen = 0
+        while True:
+            with flight.cond:
+                deadline = time.monotonic() + self.wait_timeout
+                while len(flight.chunks) == seen and not flight.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise FlightInterrupted(f"no output from the shared request for {self.wait_timeout}s")
+                    flight.cond.wait(remaining)
+                new = flight.chunks[seen:]
+                finished = flight.done
+                error = flight.error
+            seen += len(new)
+            yield from new
+            if finished and seen == len(flight.chunks):
+                if isinstance(error, FlightInterrupted) and not seen:
+                    yield from self.stream(key, make_stream)
+                    return
+                if error is not None:
+                    raise error
+                return
+
+
+# ============================================
+# THROTTLE (token bucket + concurrency limit)
+# ============================================
+class TokenBucket:
+    """`rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _wait_time(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Throttle:
+    """Caps request rate and concurrency for one backend; excess callers queue"""
+
+    def __init__(self, rate=5.0, burst=10, max_concurrent=8, queue_timeout=30):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            self.waiting += 1
+        start = time.monotonic()
+        try:
+            acquired = self.slots.acquire(timeout=self.queue_timeout)
+            remaining = self.queue_timeout - (time.monotonic() - start)
+            if acquired and not self.bucket.acquire(timeout=max(remaining, 0)):
+                self.slots.release()
+                acquired = False
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise ThrottleTimeout(f"backend busy, queued for {self.queue_timeout}s")
+        try:
+            yield
+        finally:
+            self.slots.release()
@@ -0,0 +1,201 @@
+"""
+Prompt Context Builder
+======================
+Pulls only the plays relevant to a question into the prompt, under a token budget
+"""
+
+import re
+
+import numpy as np
+
+from decision_model import conversion_rate
+from schema import find_teams, parse_field_position
+
+# Columns sent to the model, in order; others are pruned
+CONTEXT_COLUMNS = [
+    "POSTEAM", "QUARTER", "TIME", "YARDS_TO_GO", "FIELD_POSITION", "SCORE_DIFFERENTIAL",
+    "PLAY_TYPE", "WIN_PROB_PCT", "WPA_PCT", "EPA", "WP_GO", "WP_PUNT", "WP_FG", "BEST_DECISION",
+    "GRADE", "PLAY_DESCRIPTION",
+]
+
+CHARS_PER_TOKEN = 4
+
+# Weight of each matched feature when ranking plays
+FEATURE_WEIGHTS = {
+    "team": 1.0,
+    "quarter": 3.0,
+    "distance": 3.0,
+    "field": 2.0,
+    "score": 2.0,
+}
+
+ORDINALS = {"first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3, "fourth": 4, "4th": 4}
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# ============================================
+# PLAY FEATURES
+# ============================================
+def distance_bucket(ydstogo):
+    return np.select([ydstogo <= 2, ydstogo <= 6], ["short", "medium"], default="long")
+
+
+def field_bucket(df):
+    """own / opponent / redzone from the offense's yardline"""
+    if "YARDLINE_OWN" in df.columns:
+        yardline = df["YARDLINE_OWN"].to_numpy(dtype=float, na_value=np.nan)
+    else:
+        yardline = parse_field_position(df["FIELD_POSITION"], df.get("POSTEAM")).to_numpy(dtype=float)
+    yards_to_goal = 100 - yardline
+    return np.select([yards_to_goal <= 20, yards_to_goal <= 60], ["redzone", "opponent"], default="own")
+
+
+def score_bucket(diff):
+    return np.select([diff <= -9, diff < 0, diff == 0], ["trailing_big", "trailing", "tied"], default="leading")
+
+
+class PlayIndex:
+    """Inverted index: feature -> value -> row positions"""
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        features = {
+            "quarter": self.df["QUARTER"].to_numpy() if "QUARTER" in df.columns else np.zeros(len(df)),
+            "distance": distance_bucket(self.df["YARDS_TO_GO"].to_numpy()),
+            "field": field_bucket(self.df),
+            "score": score_bucket(self.df["SCORE_DIFFERENTIAL"].to_numpy()),
+            "team": self.df["POSTEAM"].astype(str).str.upper().to_numpy() if "POSTEAM" in df.columns
+                    else np.full(len(df), "NE"),
+        }
+        self.postings = {}
+        for name, values in features.items():
+            self.postings[name] = {value: np.flatnonzero(values == value) for value in np.unique(values)}
+        self.yards_to_go = self.df["YARDS_TO_GO"].to_numpy()
+        wpa = self.df["WPA_PCT"].to_numpy(dtype=float) if "WPA_PCT" in df.columns else np.zeros(len(df))
+        self.leverage = np.nan_to_num(np.abs(wpa))
+        # Size of the old to_string() dump, extrapolated from a sample
+        sample = self.df.head(50)
+        self.full_table_tokens = estimate_tokens(sample.to_string()) * len(self.df) // max(len(sample), 1)
+
+    def __len__(self):
+        return len(self.df)
+
+    def score(self, question):
+        """Relevance score of every play for the question"""
+        query = parse_question(question)
+        scores = np.zeros(len(self.df))
+        for name, values in query.items():
+            if name == "yards":
+                scores[self.yards_to_go == values] += FEATURE_WEIGHTS["distance"]
+                continue
+            for value in values:
+                rows = self.postings.get(name, {}).get(value)
+                if rows is not None:
+                    scores[rows] += FEATURE_WEIGHTS[name]
+        # Ties broken toward the plays that moved win probability most
+        max_leverage = self.leverage.max() if len(self.leverage) else 0
+        if max_leverage > 0:
+            scores += self.leverage / max_leverage
+        return scores
+
+    def top_k(self, question, k):
+        scores = self.score(question)
+        k = min(k, len(scores))
+        if k == 0:
+            return np.array([], dtype=int)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+
+def parse_question(question):
+    """Extract quarter, distance, field, score and team hints from free text"""
+    text = question.lower()
+    query = {}
+
+    quarters = {int(q) for q in re.findall(r"\bq([1-4])\b", text)}
+    quarters |= {ORDINALS[w] for w in re.findall(r"\b(first|second|third|fourth|1st|2nd|3rd|4th)\s+quarter", text)}
+    if quarters:
+        query["quarter"] = quarters
+
+    yards = re.search(r"4th\s*(?:&|and)\s*(\d+)", text)
+    if yards:
+        query["yards"] = int(yards.group(1))
+    elif "short" in text or "inches" in text:
+        query["distance"] = {"short"}
+    elif "long" in text:
+        query["distance"] = {"long"}
+
+    if re.search(r"\bown\s+\d+|own territory|backed up", text):
+        query["field"] = {"own"}
+    elif "red zone" in text:
+        query["field"] = {"redzone"}
+    elif "midfield" in text or "their territory" in text or "opponent territory" in text:
+        query["field"] = {"opponent"}
+
+    if re.search(r"\bdown (?:by )?(9|1\d|2\d)\b|two scores?|blowout", text):
+        query["score"] = {"trailing_big"}
+    elif "trailing" in text or "behind" in text or re.search(r"\bdown (?:by )?\d\b", text):
+        query["score"] = {"trailing", "trailing_big"}
+    elif "tied" in text:
+        query["score"] = {"tied"}
+
+    teams = find_teams(question)
+    if teams:
+        query["team"] = teams
+    return query
+
+
+# ============================================
+# CONTEXT ENCODING
+# ============================================
+def build_context(index, question, top_k=25, token_budget=1500):
+    """Compact CSV of the top-k relevant plays that fits the token budget, plus a size report"""
+    columns = [c for c in CONTEXT_COLUMNS if c in index.df.columns]
+    ranked = index.df.iloc[index.top_k(question, top_k)][columns]
+
+    header = ",".join(columns) + "\n"
+    lines = ranked.to_csv(index=False, header=False, float_format="%.2f").splitlines(keepends=True)
+    used = estimate_tokens(header)
+    kept = []
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        kept.append(line)
+        used += cost
+    context = header + "".join(kept)
+
+    report = {
+        "plays_total": len(index),
+        "plays_included": len(kept),
+        "context_tokens": estimate_tokens(context),
+        "token_budget": token_budget,
+        "full_table_tokens": index.full_table_tokens,
+    }
+    return context, report
+
+
+def system_prompt(index, question, conversation="", top_k=25, token_budget=1500, league=""):
+    """System prompt with the plays most relevant to the question, league norms, and prior turns for follow-ups"""
+    data_context, report = build_context(index, question, top_k=top_k, token_budget=token_budget)
+    report["league_tokens"] = estimate_tokens(league) if league else 0
+    league_section = f"\n{league}\n" if league else ""
+    prompt = f"""You are an NFL analytics expert analyzing the Patriots' 4th down decisions in Super Bowl LX (Seahawks 29, Patriots 13).
+
+Here are the {report['plays_included']} most relevant of {report['plays_total']} Patriots 4th down plays (CSV):
+{data_context}{league_section}
+
+Key facts:
+- NFL 4th & 1 conversion rate is {conversion_rate(1):.0%}
+- The Patriots punted on 4th & 1 from their own 41 while down 12-0 in Q3
+- WPA = Win Probability Added (negative means the decision hurt their chances)
+- EPA = Expected Points Added
+- WP_GO / WP_PUNT / WP_FG = model win probability (%) for each option; BEST_DECISION is the highest
+
+Answer questions concisely and reference specific plays from the data."""
+    if conversation:
+        prompt += f"\n\n{conversation}\n\nUse the conversation to resolve follow-up questions."
+    return prompt, report
@@ -0,0 +1,197 @@
+"""
+Play-by-Play Data Sources
+=========================
+Pluggable loaders for 4th down plays: bundled sample, nflfastR Parquet, Snowflake
+"""
+
+import re
+
+import pandas as pd
+
+# nflfastR column -> app column; only these are read (column pruning)
+NFLFASTR_COLUMNS = {
+    "game_id": "GAME_ID",
+    "season": "SEASON",
+    "posteam": "POSTEAM",
+    "defteam": "DEFTEAM",
+    "qtr": "QUARTER",
+    "time": "TIME",
+    "ydstogo": "YARDS_TO_GO",
+    "yrdln": "FIELD_POSITION",
+    "posteam_score": "POSTEAM_SCORE",
+    "defteam_score": "DEFTEAM_SCORE",
+    "score_differential": "SCORE_DIFFERENTIAL",
+    "play_type": "PLAY_TYPE",
+    "wp": "WIN_PROB_PCT",
+    "wpa": "WPA_PCT",
+    "epa": "EPA",
+    "punt_attempt": "PUNT_ATTEMPT",
+    "desc": "PLAY_DESCRIPTION",
+}
+
+FOURTH_DOWN_COLUMNS = list(NFLFASTR_COLUMNS.values())
+
+# nflfastR stores probabilities as 0-1; the app shows percentages
+PERCENT_COLUMNS = ["WIN_PROB_PCT", "WPA_PCT"]
+
+
+def _to_app_frame(df):
+    """Rename nflfastR columns and scale probabilities to percent"""
+    df = df.rename(columns=NFLFASTR_COLUMNS)
+    for col in PERCENT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col] * 100
+    return df[[c for c in FOURTH_DOWN_COLUMNS if c in df.columns]].reset_index(drop=True)
+
+
+# ============================================
+# SAMPLE (Super Bowl LX, hand-charted)
+# ============================================
+SAMPLE_GAME = {"GAME_ID": "2025_22_SEA_NE", "SEASON": 2025, "POSTEAM": "NE", "DEFTEAM": "SEA"}
+
+SAMPLE_PLAYS = [
+    {"QUARTER": 1, "TIME": "10:23", "YARDS_TO_GO": 8, "FIELD_POSITION": "SEA 44", 
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 3, "SCORE_DIFFERENTIAL": -3, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 38.0, "WPA_PCT": -3.0, "EPA": -0.5, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt to SEA 20"},
+    {"QUARTER": 1, "TIME": "5:45", "YARDS_TO_GO": 15, "FIELD_POSITION": "NE 35",
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 3, "SCORE_DIFFERENTIAL": -3, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 35.0, "WPA_PCT": -2.0, "EPA": -0.3, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt downed at SEA 15"},
+    {"QUARTER": 2, "TIME": "9:30", "YARDS_TO_GO": 17, "FIELD_POSITION": "NE 28",
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 6, "SCORE_DIFFERENTIAL": -6, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 25.0, "WPA_PCT": -3.0, "EPA": -0.4, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt to SEA 25"},
+    {"QUARTER": 2, "TIME": "2:15", "YARDS_TO_GO": 6, "FIELD_POSITION": "SEA 38",
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 6, "SCORE_DIFFERENTIAL": -6, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 22.0, "WPA_PCT": -2.5, "EPA": -0.6, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt into end zone, touchback"},
+    {"QUARTER": 3, "TIME": "8:40", "YARDS_TO_GO": 1, "FIELD_POSITION": "OWN 41",
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 12, "SCORE_DIFFERENTIAL": -12, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 12.0, "WPA_PCT": -4.2, "EPA": -0.8, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "4th & 1 PUNT from own 41 - THE KEY PLAY"},
+    {"QUARTER": 3, "TIME": "2:30", "YARDS_TO_GO": 8, "FIELD_POSITION": "NE 23",
+     "POSTEAM_SCORE": 0, "DEFTEAM_SCORE": 12, "SCORE_DIFFERENTIAL": -12, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 8.0, "WPA_PCT": -2.0, "EPA": -0.3, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt to SEA 45"},
+    {"QUARTER": 4, "TIME": "12:05", "YARDS_TO_GO": 11, "FIELD_POSITION": "NE 19",
+     "POSTEAM_SCORE": 6, "DEFTEAM_SCORE": 19, "SCORE_DIFFERENTIAL": -13, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 5.0, "WPA_PCT": -1.5, "EPA": -0.2, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt to SEA 35"},
+    {"QUARTER": 4, "TIME": "5:20", "YARDS_TO_GO": 4, "FIELD_POSITION": "SEA 48",
+     "POSTEAM_SCORE": 13, "DEFTEAM_SCORE": 22, "SCORE_DIFFERENTIAL": -9, "PLAY_TYPE": "punt",
+     "WIN_PROB_PCT": 6.0, "WPA_PCT": -3.0, "EPA": -0.7, "PUNT_ATTEMPT": 1,
+     "PLAY_DESCRIPTION": "Punt with 5 min left, down 9"},
+]
+
+
+class SampleSource:
+    """Patriots 4th down data from Super Bowl LX"""
+
+    cache_key = "sample"
+
+    def load(self, seasons=(), game_ids=(), posteams=()):
+        df = pd.DataFrame([{**SAMPLE_GAME, **play} for play in SAMPLE_PLAYS])
+        mask = pd.Series(True, index=df.index)
+        if seasons:
+            mask &= df["SEASON"].isin(seasons)
+        if game_ids:
+            mask &= df["GAME_ID"].isin(game_ids)
+        if posteams:
+            mask &= df["POSTEAM"].isin(posteams)
+        return df[mask][[c for c in FOURTH_DOWN_COLUMNS if c in df.columns]].reset_index(drop=True)
+
+
+# ============================================
+# PARQUET / ARROW (nflfastR play_by_play_*.parquet)
+# ============================================
+class ParquetSource:
+    """Reads a Parquet file or directory (optionally hive-partitioned by season) with pyarrow.dataset"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cache_key = f"parquet:{path}"
+
+    def load(self, seasons=(), game_ids=(), posteams=()):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(self.path, format="parquet", partitioning="hive")
+        # Predicates are pushed into the scan so row groups that cannot match are skipped
+        expr = ds.field("down") == 4
+        if seasons:
+            expr &= ds.field("season").isin(list(seasons))
+        if game_ids:
+            expr &= ds.field("game_id").isin(list(game_ids))
+        if posteams:
+            expr &= ds.field("posteam").isin(list(posteams))
+        columns = [c for c in NFLFASTR_COLUMNS if c in dataset.schema.names]
+        table = dataset.to_table(columns=columns, filter=expr)
+        return _to_app_frame(table.to_pandas())
+
+
+# ============================================
+# SNOWFLAKE TABLE
+# ============================================
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*(\.[A-Za-z_][A-Za-z0-9_$]*){0,2}$")
+
+
+class SnowflakeSource:
+    """Reads an nflfastR-shaped table through the connection pool; filters run in the warehouse"""
+
+    def __init__(self, pool, table):
+        if not _IDENTIFIER.match(table):
+            raise ValueError(f"Invalid Snowflake table name: {table!r}")
+        self.pool = pool
+        self.table = table
+        self.cache_key = f"snowflake:{table}"
+
+    def build_query(self, seasons=(), game_ids=(), posteams=()):
+        """SELECT with pruned columns and bound WHERE predicates"""
+        where = ["down = 4"]
+        params = []
+        for column, values in (("season", seasons), ("game_id", game_ids), ("posteam", posteams)):
+            if values:
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        # DESC is a reserved word and must be quoted
+        columns = ", ".join('"DESC"' if c == "desc" else c for c in NFLFASTR_COLUMNS)
+        sql = f"SELECT {columns} FROM {self.table} WHERE {' AND '.join(where)}"
+        return sql, params
+
+    def load(self, seasons=(), game_ids=(), posteams=()):
+        sql, params = self.build_query(seasons, game_ids, posteams)
+
+        def fetch(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                df = cursor.fetch_pandas_all()
+            finally:
+                cursor.close()
+            return df
+
+        df = self.pool.run(fetch)
+        df.columns = [c.lower() for c in df.columns]
+        return _to_app_frame(df)
+
+
+# ============================================
+# CONFIGURATION
+# ============================================
+def source_from_config(data_config, pool=None):
+    """Play-by-play backend for a [data] config section (default: bundled sample)"""
+    kind = data_config.get("source", "sample")
+    if kind == "parquet":
+        return ParquetSource(data_config["path"])
+    if kind == "snowflake":
+        return SnowflakeSource(pool, data_config["table"])
+    return SampleSource()
+
+
+def query_from_config(data_config):
+    """Hashable load() filters from a [data] config section"""
+    return {
+        "seasons": tuple(data_config.get("seasons", ())),
+        "game_ids": tuple(data_config.get("game_ids", ())),
+        "posteams": tuple(data_config.get("posteams", ())),
+    }
@@ -0,0 +1,168 @@
+"""
+4th Down Decision Model
+=======================
+Win probability of going for it, punting and kicking, for every play at once
+"""
+
+import functools
+import json
+
+import numpy as np
+import pandas as pd
+
+from grading import grade_fourth_downs
+
+# ============================================
+# LOOKUP TABLES (league averages, breakpoints are linearly interpolated)
+# ============================================
+# P(convert) by yards to go
+CONVERSION_RATE = {1: 0.72, 2: 0.60, 3: 0.55, 4: 0.50, 5: 0.45, 6: 0.42, 7: 0.39, 8: 0.36,
+                   9: 0.33, 10: 0.31, 15: 0.22, 20: 0.15, 30: 0.08, 99: 0.02}
+
+# Expected points of 1st & 10 by yards to the opponent's goal
+EXPECTED_POINTS = {1: 6.0, 5: 5.2, 10: 4.6, 20: 3.8, 30: 3.1, 40: 2.5, 50: 1.9, 60: 1.4,
+                   70: 0.9, 80: 0.4, 90: -0.2, 99: -0.9}
+
+# Net punt yards by yards to the opponent's goal at the line of scrimmage
+PUNT_NET_YARDS = {30: 18, 35: 23, 40: 29, 50: 36, 60: 40, 70: 42, 80: 42, 99: 40}
+
+# P(make) by kick distance (line of scrimmage + 17 yards)
+FG_MAKE_RATE = {18: 0.99, 30: 0.96, 40: 0.88, 45: 0.82, 50: 0.72, 55: 0.60, 60: 0.40,
+                65: 0.15, 70: 0.0, 117: 0.0}
+
+# Points per game standard deviation, used to turn expected margin into WP
+GAME_POINTS_SIGMA = 13.45
+GAME_SECONDS = 3600
+TOUCHBACK_YARDLINE = 80
+KICKOFF_YARDLINE = 70
+MAX_FG_DISTANCE = 65
+
+# Grades from WP lost versus the best option, in percentage points
+MODEL_GRADE_RULES = [
+    {"grade": "🔴 TERRIBLE", "when": [("WP_COST", ">=", 3.0)]},
+    {"grade": "🔴 BAD", "when": [("WP_COST", ">=", 1.25)]},
+    {"grade": "🟡 QUESTIONABLE", "when": [("WP_COST", ">=", 0.5)]},
+]
+
+DECISIONS = np.array(["go", "punt", "fg"])
+
+
+def _interpolate(breakpoints, size):
+    xs = np.array(sorted(breakpoints), dtype=float)
+    ys = np.array([breakpoints[x] for x in sorted(breakpoints)], dtype=float)
+    return np.interp(np.arange(size), xs, ys)
+
+
+@functools.lru_cache(maxsize=None)
+def load_tables(path=None):
+    """Dense lookup arrays indexed by yards; read once per process (optionally from a JSON override)"""
+    overrides = {}
+    if path:
+        with open(path) as f:
+            overrides = {name: {int(k): v for k, v in table.items()} for name, table in json.load(f).items()}
+    return {
+        "conversion": _interpolate(overrides.get("conversion", CONVERSION_RATE), 100),
+        "expected_points": _interpolate(overrides.get("expected_points", EXPECTED_POINTS), 101),
+        "punt_net": _interpolate(overrides.get("punt_net", PUNT_NET_YARDS), 101),
+        "fg_make": _interpolate(overrides.get("fg_make", FG_MAKE_RATE), 118),
+    }
+
+
+def _lookup(table, index):
+    return table[np.clip(np.nan_to_num(index, nan=0).astype(int), 0, len(table) - 1)]
+
+
+def _norm_cdf(x):
+    """Standard normal CDF (Abramowitz-Stegun 7.1.26), vectorized"""
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+
+def win_probability(margin, seconds_remaining):
+    """P(win) for an expected final margin with the given time left"""
+    sigma = GAME_POINTS_SIGMA * np.sqrt(np.maximum(seconds_remaining, 30) / GAME_SECONDS)
+    return _norm_cdf(margin / sigma)
+
+
+# ============================================
+# VECTORIZED EVALUATION
+# ============================================
+def evaluate_decisions(df, tables=None):
+    """WP for go / punt / field goal on every row, plus the best option and the WP cost of the call made"""
+    tables = tables or load_tables()
+    ydstogo = df["YARDS_TO_GO"].to_numpy(dtype=float)
+    to_goal = 100 - df["YARDLINE_OWN"].to_numpy(dtype=float)
+    margin = df["SCORE_DIFFERENTIAL"].to_numpy(dtype=float)
+    remaining = GAME_SECONDS - df["GAME_SECONDS"].to_numpy(dtype=float) if "GAME_SECONDS" in df.columns \
+        else np.full(len(df), GAME_SECONDS / 2)
+    ep = tables["expected_points"]
+
+    # Go: convert -> 1st down at the marker; fail -> opponent takes over here
+    conv = _lookup(tables["conversion"], ydstogo)
+    after_gain = np.maximum(to_goal - ydstogo, 1)
+    ev_go = conv * _lookup(ep, after_gain) - (1 - conv) * _lookup(ep, 100 - to_goal)
+
+    # Punt: opponent takes over net yards downfield, touchback at their 20
+    net = _lookup(tables["punt_net"], to_goal)
+    opp_to_goal = np.where(to_goal - net < 20, TOUCHBACK_YARDLINE, 100 - (to_goal - net))
+    ev_punt = -_lookup(ep, opp_to_goal)
+
+    # Field goal: make -> 3 points and kick off; miss -> opponent at the spot of the kick
+    distance = to_goal + 17
+    make = _lookup(tables["fg_make"], distance)
+    miss_to_goal = np.minimum(100 - (to_goal + 7), TOUCHBACK_YARDLINE)
+    ev_fg = make * (3 - _lookup(ep, KICKOFF_YARDLINE)) - (1 - make) * _lookup(ep, miss_to_goal)
+    ev_fg = np.where(distance <= MAX_FG_DISTANCE, ev_fg, np.nan)
+
+    wp = np.column_stack([
+        win_probability(margin + ev_go, remaining),
+        win_probability(margin + ev_punt, remaining),
+        win_probability(margin + ev_fg, remaining),
+    ]) * 100
+    best = np.argmax(np.nan_to_num(wp, nan=-np.inf), axis=1)
+
+    actual = actual_decision(df)
+    actual_idx = np.select([actual == "punt", actual == "fg"], [1, 2], default=0)
+    actual_wp = wp[np.arange(len(df)), actual_idx]
+
+    return pd.DataFrame({
+        "CONV_PROB": conv,
+        "PUNT_NET_YARDS": net,
+        "PUNT_OPP_YARDLINE": 100 - opp_to_goal,
+        "FG_MAKE_PROB": np.where(distance <= MAX_FG_DISTANCE, make, np.nan),
+        "WP_GO": wp[:, 0],
+        "WP_PUNT": wp[:, 1],
+        "WP_FG": wp[:, 2],
+        "BEST_DECISION": DECISIONS[best],
+        "ACTUAL_DECISION": actual,
+        "WP_COST": np.nan_to_num(wp[np.arange(len(df)), best] - actual_wp),
+    }, index=df.index)
+
+
+def actual_decision(df):
+    """go / punt / fg from PLAY_TYPE and PUNT_ATTEMPT"""
+    play_type = df["PLAY_TYPE"].astype(str).str.lower().to_numpy() if "PLAY_TYPE" in df.columns \
+        else np.full(len(df), "")
+    punt = df["PUNT_ATTEMPT"].to_numpy() == 1 if "PUNT_ATTEMPT" in df.columns else play_type == "punt"
+    return np.select([punt | (play_type == "punt"), play_type == "field_goal"], ["punt", "fg"], default="go")
+
+
+def add_decision_columns(df, tables=None):
+    """Return df with the model columns appended"""
+    return pd.concat([df, evaluate_decisions(df, tables)], axis=1)
+
+
+def grade_plays(df, tables=None):
+    """Model columns plus a GRADE by WP given up; the frame every view and prompt is built from"""
+    df = add_decision_columns(df, tables)
+    df["GRADE"] = grade_fourth_downs(df, rules=MODEL_GRADE_RULES)
+    return df
+
+
+def conversion_rate(ydstogo, tables=None):
+    """League conversion probability for a single distance"""
+    tables = tables or load_tables()
+    return float(_lookup(tables["conversion"], np.array([ydstogo]))[0])
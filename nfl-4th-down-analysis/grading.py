@@ -0,0 +1,109 @@
+"""
+Decision Grading
+================
+Rule-table grading for 4th down decisions, evaluated column-wise
+"""
+
+import operator
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# RULE TABLE
+# ============================================
+# Rules are checked top to bottom; the first rule whose conditions all hold
+# sets the grade. Each condition is (column, op, value).
+DEFAULT_GRADE = "✅ OK"
+
+DEFAULT_GRADE_RULES = [
+    {"grade": "🔴 TERRIBLE", "when": [("PUNT_ATTEMPT", "==", 1), ("YARDS_TO_GO", "<=", 1), ("SCORE_DIFFERENTIAL", "<=", -10)]},
+    {"grade": "🔴 BAD", "when": [("PUNT_ATTEMPT", "==", 1), ("YARDS_TO_GO", "<=", 2), ("SCORE_DIFFERENTIAL", "<=", -7)]},
+    {"grade": "🟡 QUESTIONABLE", "when": [("PUNT_ATTEMPT", "==", 1), ("YARDS_TO_GO", "<=", 4), ("SCORE_DIFFERENTIAL", "<=", -9)]},
+    {"grade": "🟡 QUESTIONABLE", "when": [("PUNT_ATTEMPT", "==", 1), ("WPA_PCT", "<", -3)]},
+]
+
+# Values used when a column is missing from the frame
+COLUMN_DEFAULTS = {
+    "YARDS_TO_GO": 10,
+    "SCORE_DIFFERENTIAL": 0,
+    "WPA_PCT": 0,
+    "PUNT_ATTEMPT": 0,
+}
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def validate_rules(rules):
+    """Check a user-supplied rule set and raise ValueError if it is malformed"""
+    for i, rule in enumerate(rules):
+        if "grade" not in rule or "when" not in rule:
+            raise ValueError(f"Rule {i} needs 'grade' and 'when' keys")
+        for cond in rule["when"]:
+            if len(cond) != 3:
+                raise ValueError(f"Rule {i} condition {cond!r} must be (column, op, value)")
+            if cond[1] not in OPERATORS:
+                raise ValueError(f"Rule {i} uses unknown operator {cond[1]!r}")
+    return rules
+
+
+def _column(df, name, defaults):
+    if name in df.columns:
+        return df[name].to_numpy()
+    if name in defaults:
+        return np.full(len(df), defaults[name])
+    raise KeyError(f"Column {name!r} not in data and has no default")
+
+
+# ============================================
+# VECTORIZED GRADING
+# ============================================
+def grade_fourth_downs(df, rules=None, default=DEFAULT_GRADE, defaults=None):
+    """Grade every row in one pass using boolean masks and np.select"""
+    rules = DEFAULT_GRADE_RULES if rules is None else validate_rules(rules)
+    defaults = COLUMN_DEFAULTS if defaults is None else {**COLUMN_DEFAULTS, **defaults}
+
+    columns = {}
+    conditions = []
+    for rule in rules:
+        mask = np.ones(len(df), dtype=bool)
+        for col, op, value in rule["when"]:
+            if col not in columns:
+                columns[col] = _column(df, col, defaults)
+            mask &= np.asarray(OPERATORS[op](columns[col], value), dtype=bool)
+        conditions.append(mask)
+
+    if not conditions:
+        return pd.Series(default, index=df.index, dtype=object)
+
+    grades = np.select(conditions, [rule["grade"] for rule in rules], default=default)
+    return pd.Series(grades, index=df.index, dtype=object)
+
+
+# ============================================
+# ROW-WISE REFERENCE
+# ============================================
+def grade_decision(row):
+    """Original per-row grader, kept as the reference for grade_fourth_downs"""
+    ydstogo = row.get('YARDS_TO_GO', 10)
+    score_diff = row.get('SCORE_DIFFERENTIAL', 0)
+    wpa = row.get('WPA_PCT', 0)
+    punt = row.get('PUNT_ATTEMPT', 0)
+
+    if punt == 1:
+        if ydstogo <= 1 and score_diff <= -10:
+            return "🔴 TERRIBLE"
+        elif ydstogo <= 2 and score_diff <= -7:
+            return "🔴 BAD"
+        elif ydstogo <= 4 and score_diff <= -9:
+            return "🟡 QUESTIONABLE"
+        elif wpa < -3:
+            return "🟡 QUESTIONABLE"
+    return "✅ OK"
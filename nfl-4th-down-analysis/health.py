@@ -0,0 +1,66 @@
+"""
+Backend Health
+==============
+Background probes so status displays read cached state instead of doing network I/O
+"""
+
+import threading
+import time
+
+
+class HealthMonitor:
+    """Runs each {name: probe} every `interval` seconds on a daemon thread.
+
+    A probe returns truthy when the backend is up; exceptions count as down.
+    """
+
+    def __init__(self, probes, interval=30):
+        self.probes = probes
+        self.interval = interval
+        self._status = {
+            name: {"ok": None, "latency": None, "checked_at": None, "error": None}
+            for name in probes
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self, name):
+        """Run one probe now and store its outcome"""
+        start = time.monotonic()
+        try:
+            ok, error = bool(self.probes[name]()), None
+        except Exception as e:
+            ok, error = False, str(e)[:200]
+        status = {
+            "ok": ok,
+            "latency": time.monotonic() - start,
+            "checked_at": time.time(),
+            "error": error,
+        }
+        with self._lock:
+            self._status[name] = status
+        return status
+
+    def probe_all(self):
+        for name in self.probes:
+            self.probe(name)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Last known status per probe; never blocks on the network"""
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
@@ -0,0 +1,254 @@
+"""
+Hedged LLM Calls
+================
+Timeout-bounded, hedged streams across backends with circuit breaking, pumped on worker threads
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+
+
+class BackendUnavailable(Exception):
+    """Every backend failed, timed out or is circuit-broken"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors.items()) or "no backends")
+
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; retries after `reset_after` seconds"""
+
+    def __init__(self, failure_threshold=3, reset_after=30):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+# ============================================
+# LATENCY
+# ============================================
+class LatencyStats:
+    """Rolling window of successful call latencies plus error count"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self.samples)
+            errors = self.errors
+        if len(samples) == 0:
+            return {"count": 0, "errors": errors, "p50": None, "p95": None, "p99": None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"count": len(samples), "errors": errors, "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+# ============================================
+# HEDGED CLIENT
+# ============================================
+class HedgedClient:
+    """Streams from backends in order, hedging to the next one after `hedge_after` seconds"""
+
+    def __init__(self, hedge_after=4.0, timeouts=None, default_timeout=30,
+                 failure_threshold=3, reset_after=30, max_workers=16):
+        self.hedge_after = hedge_after
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.breakers = {}
+        self.latency = {}
+        # Own executor: every backend stream is pumped on its own worker thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+
+    def _backend(self, name):
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_after)
+                self.latency[name] = LatencyStats()
+            return self.breakers[name], self.latency[name]
+
+    def available(self, name):
+        return self._backend(name)[0].allow()
+
+    def record(self, name, seconds=None, error=None):
+        """Record a backend outcome for its circuit breaker and latency stats"""
+        breaker, latency = self._backend(name)
+        if error is not None:
+            breaker.record_failure()
+            latency.record_error()
+        else:
+            breaker.record_success()
+            latency.record(seconds)
+
+    def _timeout(self, name):
+        return self.timeouts.get(name, self.default_timeout)
+
+    def _pump(self, name, make_stream, events, cancel, slot=None):
+        """Worker: forward a backend's chunks to `events` until it ends, fails or is cancelled"""
+        with ExitStack() as stack:
+            try:
+                if slot is not None:
+                    stack.enter_context(slot())
+            except Exception as e:
+                events.put((name, "rejected", e))
+                return
+            if cancel.is_set():
+                return
+            events.put((name, "started", time.monotonic()))
+            chunks = None
+            try:
+                chunks = iter(make_stream())
+                for chunk in chunks:
+                    if cancel.is_set():
+                        break
+                    events.put((name, "chunk", chunk))
+                events.put((name, "done", None))
+            except Exception as e:
+                events.put((name, "error", e))
+            finally:
+                # Closing runs the stream's own cleanup (e.g. connection checkin) on this thread
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+
+    def stream(self, streams, slots=None):
+        """Yield (name, chunk) from {name: make_stream} in priority order, hedging on time-to-first-token.
+
+        The next backend starts if no token arrived within `hedge_after`; the first one to produce
+        a token wins and the rest are cancelled. Each backend's timeout bounds the wait for its
+        first token and every gap between tokens after that. Time spent waiting for one of `slots`
+        counts towards hedging but not towards timeouts, latency or the circuit breaker.
+        """
+        slots = slots or {}
+        errors = {}
+        queued = []
+        for name in streams:
+            if self._backend(name)[0].allow():
+                queued.append(name)
+            else:
+                errors[name] = RuntimeError("circuit open")
+        events = queue.Queue()
+        running = {}
+        winner = None
+        hedge_at = None
+
+        def launch():
+            nonlocal hedge_at
+            name = queued.pop(0)
+            # "started" / "last" stay None while the backend waits for its slot
+            running[name] = {"cancel": threading.Event(), "started": None, "last": None}
+            hedge_at = time.monotonic() + self.hedge_after
+            self._executor.submit(self._pump, name, streams[name], events, running[name]["cancel"], slots.get(name))
+
+        def drop(name, error):
+            running.pop(name)["cancel"].set()
+            self.record(name, error=error)
+            errors[name] = error
+
+        try:
+            if queued:
+                launch()
+            while running:
+                deadlines = [state["last"] + self._timeout(name) for name, state in running.items() if state["last"]]
+                if winner is None and queued:
+                    deadlines.append(hedge_at)
+                wait = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+                try:
+                    name, kind, value = events.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    for name in [n for n, state in running.items()
+                                 if state["last"] and now - state["last"] >= self._timeout(n)]:
+                        error = TimeoutError(f"timed out after {self._timeout(name)}s")
+                        drop(name, error)
+                        if name == winner:
+                            raise error
+                    if winner is None and queued and (not running or now >= hedge_at):
+                        launch()
+                    continue
+                if name not in running:
+                    continue  # a cancelled or timed-out backend finishing late
+                if kind == "started":
+                    running[name]["started"] = running[name]["last"] = value
+                elif kind == "rejected":
+                    # No slot in time (e.g. ThrottleTimeout): the backend was never called
+                    running.pop(name)
+                    errors[name] = value
+                    if queued and not running:
+                        launch()
+                elif kind == "chunk":
+                    if winner is None:
+                        winner = name
+                        self.record(name, time.monotonic() - running[name]["started"])
+                        for loser in [n for n in running if n != name]:
+                            running.pop(loser)["cancel"].set()
+                        queued.clear()
+                    running[name]["last"] = time.monotonic()
+                    yield name, value
+                elif kind == "done" and name == winner:
+                    return
+                else:
+                    drop(name, value if kind == "error" else RuntimeError("empty response"))
+                    if name == winner:
+                        raise value
+                    if queued and not running:
+                        launch()
+            raise BackendUnavailable(errors)
+        finally:
+            # Also reached when the consumer stops reading: stop every backend still streaming
+            for state in running.values():
+                state["cancel"].set()
+
+    def stats(self):
+        with self._lock:
+            names = list(self.latency)
+        return {
+            name: {**self.latency[name].summary(), "state": self.breakers[name].state}
+            for name in names
+        }
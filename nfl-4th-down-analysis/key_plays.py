@@ -0,0 +1,83 @@
+"""
+Key Play Ranking
+================
+Scores every 4th down by what the call cost and keeps the top-k per game
+"""
+
+import numpy as np
+import pandas as pd
+
+from schema import format_field_position
+
+TOP_K = 5
+# A wrong call on 4th & short is the classic mistake; it gets a flat bonus in points of WP
+SHORT_YARDAGE = 2
+SHORT_MISMATCH_BONUS = 1.0
+
+
+def decision_cost(df):
+    """|WPA| plus twice the model WP cost, plus the short-yardage bonus, scaled by leverage"""
+    wpa = np.abs(df["WPA_PCT"].to_numpy(dtype=float, na_value=0))
+    wp_cost = df["WP_COST"].to_numpy(dtype=float, na_value=0) if "WP_COST" in df.columns else 0
+    mismatch = np.zeros(len(df))
+    if "BEST_DECISION" in df.columns:
+        wrong = df["ACTUAL_DECISION"].to_numpy() != df["BEST_DECISION"].to_numpy()
+        mismatch = np.where(wrong & (df["YARDS_TO_GO"].to_numpy() <= SHORT_YARDAGE), SHORT_MISMATCH_BONUS, 0)
+    # Leverage: 0.5 in a decided game, 1.0 at a coin flip
+    wp = df["WIN_PROB_PCT"].to_numpy(dtype=float, na_value=50) / 100
+    leverage = 0.5 + 2 * wp * (1 - wp)
+    return (wpa + 2 * wp_cost + mismatch) * leverage
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first, in O(n) plus O(k log k)"""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.array([], dtype=int)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class KeyPlays:
+    """Top-k costliest 4th downs per game (row positions into `plays`)"""
+
+    def __init__(self, plays, k=TOP_K):
+        self.plays = plays
+        self.scores = decision_cost(plays)
+        self.by_game = {}
+        game_ids = plays["GAME_ID"].astype(str) if "GAME_ID" in plays.columns else pd.Series("", index=plays.index)
+        codes, uniques = pd.factorize(game_ids)
+        # Counting sort groups rows by game: each row lands at its game's offset plus the number of
+        # that game's rows before it, in O(n); each group is then partitioned on its own
+        counts = np.bincount(codes, minlength=len(uniques))
+        bounds = np.cumsum(counts)
+        order = np.empty(len(codes), dtype=np.intp)
+        order[(bounds - counts)[codes] + pd.Series(codes).groupby(codes).cumcount().to_numpy()] = np.arange(len(codes))
+        bounds = bounds[:-1]
+        for game_id, positions in zip(uniques, np.split(order, bounds)):
+            self.by_game[game_id] = positions[top_k(self.scores[positions], k)]
+
+    def top(self, game_id=None):
+        """Top plays for one game, or the leaders of every game when game_id is None"""
+        if game_id is not None:
+            return self.plays.iloc[self.by_game.get(str(game_id), [])]
+        leaders = np.array([positions[0] for positions in self.by_game.values() if len(positions)], dtype=int)
+        return self.plays.iloc[leaders[top_k(self.scores[leaders], len(leaders))]]
+
+    def key_play(self):
+        """The single costliest 4th down, or None without plays"""
+        leaders = self.top()
+        return leaders.iloc[0] if len(leaders) else None
+
+
+def describe(play):
+    """Banner text like '4th & 1 from NE 41, down 12-0 in Q3 → PUNT'"""
+    spot = format_field_position(play["YARDLINE_OWN"], play["POSTEAM"], play["DEFTEAM"])
+    ours, theirs = int(play["POSTEAM_SCORE"]), int(play["DEFTEAM_SCORE"])
+    if ours < theirs:
+        score = f"down {theirs}-{ours}"
+    elif ours > theirs:
+        score = f"up {ours}-{theirs}"
+    else:
+        score = f"tied {ours}-{theirs}"
+    return f"4th & {play['YARDS_TO_GO']} from {spot}, {score} in Q{play['QUARTER']} → {play['ACTUAL_DECISION'].upper()}"
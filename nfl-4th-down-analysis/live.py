@@ -0,0 +1,166 @@
+"""
+Live Game Feed
+==============
+Tails a play feed during a game: new 4th downs are graded on arrival and appended,
+and the header totals are updated per play instead of recomputed.
+
+    python live.py feed.jsonl --replay --delay 5    # replay the sample game into a feed file
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from answer_cache import data_fingerprint
+from data_sources import SAMPLE_GAME, SAMPLE_PLAYS
+from decision_model import grade_plays
+from pushdown import FLAGGED_MARKS
+from schema import concat_plays, normalize_fourth_downs
+
+
+class JsonlFeed:
+    """One play per line in app columns (like SAMPLE_PLAYS); reads resume from the last complete line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cache_key = f"live:{path}"
+        self._offset = 0
+
+    def poll(self):
+        """Plays appended since the last poll; a half-written last line waits for the next one"""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return []
+        except FileNotFoundError:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        return [json.loads(line) for line in complete.decode().splitlines() if line.strip()]
+
+
+class RunningTotals:
+    """Header metrics kept current with a constant amount of work per play"""
+
+    def __init__(self):
+        self.punts = 0
+        self.bad_decisions = 0
+        self.total_wpa = 0.0
+        self.total_epa = 0.0
+        self.grade_counts = {}
+
+    def add(self, punt, grade, wpa, epa):
+        if punt:
+            self.punts += 1
+            self.total_wpa += 0.0 if pd.isna(wpa) else float(wpa)
+            self.total_epa += 0.0 if pd.isna(epa) else float(epa)
+        if any(mark in grade for mark in FLAGGED_MARKS):
+            self.bad_decisions += 1
+        self.grade_counts[grade] = self.grade_counts.get(grade, 0) + 1
+
+    def metrics(self):
+        """Same keys as pushdown.play_metrics"""
+        return {
+            "punts": self.punts,
+            "bad_decisions": self.bad_decisions,
+            "total_wpa": self.total_wpa,
+            "total_epa": self.total_epa,
+            "grade_counts": dict(self.grade_counts),
+        }
+
+
+def chain_fingerprint(previous, new):
+    """Fingerprint after appending `new`, from the previous fingerprint alone.
+
+    Chained row by row, so it does not depend on how the feed happened to batch the plays.
+    """
+    fingerprint = previous
+    for row in pd.util.hash_pandas_object(new, index=False).to_numpy():
+        fingerprint = hashlib.sha256(f"{fingerprint}\x1f{row}".encode()).hexdigest()[:16]
+    return fingerprint
+
+
+class LiveGame:
+    """Append-only graded plays from a feed; shared by every session, so updates hold a lock.
+
+    Each refresh costs only its new rows: graded batches are kept as chunks and the fingerprint
+    is chained from the last one. The chunks are concatenated once per version, on the first read.
+    """
+
+    def __init__(self, feed, tables=None):
+        self.feed = feed
+        self.tables = tables
+        self.totals = RunningTotals()
+        self.version = 0
+        self.updated_at = None
+        self._chunks = []
+        self._fingerprint = data_fingerprint(pd.DataFrame())
+        self._snapshot = (pd.DataFrame(), self._fingerprint)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Grade and append whatever the feed has added; returns the number of new plays"""
+        with self._lock:
+            records = self.feed.poll()
+            if not records:
+                return 0
+            new = grade_plays(normalize_fourth_downs(pd.DataFrame(records)), self.tables)
+            for punt, grade, wpa, epa in zip(new["PUNT_ATTEMPT"], new["GRADE"], new["WPA_PCT"], new["EPA"]):
+                self.totals.add(punt == 1, grade, wpa, epa)
+            # Earlier plays are already graded and hashed; only the new rows are touched
+            self._chunks.append(new)
+            self._fingerprint = chain_fingerprint(self._fingerprint, new)
+            self.version += 1
+            self.updated_at = time.time()
+            return len(new)
+
+    def snapshot(self):
+        """(plays, fingerprint) as of the last refresh"""
+        with self._lock:
+            if self._chunks:
+                # Batches since the last read are folded in with one concat, however many polls ran
+                plays = self._snapshot[0]
+                self._snapshot = (concat_plays([plays, *self._chunks] if len(plays) else self._chunks),
+                                  self._fingerprint)
+                self._chunks = []
+            return self._snapshot
+
+
+def replay_sample(path, delay=5.0):
+    """Write the bundled game into a feed file one play at a time"""
+    with open(path, "w") as f:
+        for play in SAMPLE_PLAYS:
+            f.write(json.dumps({**SAMPLE_GAME, **play}) + "\n")
+            f.flush()
+            print(f"Q{play['QUARTER']} {play['TIME']} 4th & {play['YARDS_TO_GO']}")
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("feed", help="JSONL feed path")
+    parser.add_argument("--replay", action="store_true", help="write the sample game into the feed")
+    parser.add_argument("--delay", type=float, default=5.0, help="seconds between replayed plays")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay_sample(args.feed, args.delay)
+        return
+    game = LiveGame(JsonlFeed(args.feed))
+    while True:
+        if game.refresh():
+            metrics = game.totals.metrics()
+            print(f"{len(game.snapshot()[0])} plays · punts {metrics['punts']} · "
+                  f"WPA lost {metrics['total_wpa']:.1f}% · {metrics['grade_counts']}")
+        time.sleep(args.delay)
+
+
+if __name__ == "__main__":
+    main()
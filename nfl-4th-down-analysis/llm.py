@@ -0,0 +1,130 @@
+"""
+LLM Backends
+============
+Completions from Snowflake Cortex (bound SQL, batched SQL, streaming REST) and Anthropic
+"""
+
+import json
+
+CORTEX_COMPLETE_PATH = "/api/v2/cortex/inference:complete"
+
+# Model and prompt are bound server-side (connection paramstyle="qmark"),
+# so the statement text is identical for every question
+CORTEX_COMPLETE_SQL = "SELECT SNOWFLAKE.CORTEX.COMPLETE(?, ?) AS response"
+
+CORTEX_BATCH_SIZE = 50
+
+# Cheap availability check: token counting resolves the model without generating anything
+CORTEX_PING_SQL = "SELECT SNOWFLAKE.CORTEX.COUNT_TOKENS(?, 'ping') AS tokens"
+
+
+# ============================================
+# SNOWFLAKE CORTEX (SQL, bind parameters)
+# ============================================
+def complete_cortex(conn, model, prompt):
+    """One completion through a bound COMPLETE statement"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CORTEX_COMPLETE_SQL, (model, prompt))
+        result = cursor.fetchone()
+    finally:
+        cursor.close()
+    return result[0] if result else None
+
+
+def ping_cortex(conn, model):
+    """True if Cortex functions and `model` are usable from this connection"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CORTEX_PING_SQL, (model,))
+        result = cursor.fetchone()
+    finally:
+        cursor.close()
+    return bool(result and result[0])
+
+
+def complete_cortex_batch(conn, model, prompts, batch_size=CORTEX_BATCH_SIZE):
+    """Many completions, one query per batch_size prompts; results keep input order"""
+    answers = []
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(prompts), batch_size):
+            batch = prompts[start:start + batch_size]
+            values = ", ".join(["(?, ?)"] * len(batch))
+            sql = f"""
+                SELECT idx, SNOWFLAKE.CORTEX.COMPLETE(?, prompt) AS response
+                FROM (SELECT column1 AS idx, column2 AS prompt FROM VALUES {values})
+                ORDER BY idx
+            """
+            params = [model]
+            for i, prompt in enumerate(batch):
+                params.extend([i, prompt])
+            cursor.execute(sql, params)
+            rows = dict(cursor.fetchall())
+            answers.extend(rows.get(i) for i in range(len(batch)))
+    finally:
+        cursor.close()
+    return answers
+
+
+# ============================================
+# SNOWFLAKE CORTEX (REST, server-sent events)
+# ============================================
+def parse_cortex_events(lines):
+    """Yield text deltas from Cortex COMPLETE server-sent event lines"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if not payload or payload == "[DONE]":
+            continue
+        event = json.loads(payload)
+        for choice in event.get("choices", []):
+            delta = choice.get("delta") or {}
+            text = delta.get("content") or delta.get("text")
+            if text:
+                yield text
+
+
+def stream_cortex(conn, model, prompt, max_tokens=1024, timeout=60):
+    """Stream a Cortex completion using the session token of an open connection"""
+    import requests
+
+    response = requests.post(
+        f"https://{conn.host}{CORTEX_COMPLETE_PATH}",
+        headers={
+            "Authorization": f'Snowflake Token="{conn.rest.token}"',
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream",
+        },
+        json={
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "stream": True,
+        },
+        stream=True,
+        timeout=timeout,
+    )
+    with response:
+        response.raise_for_status()
+        yield from parse_cortex_events(response.iter_lines())
+
+
+# ============================================
+# ANTHROPIC
+# ============================================
+def stream_anthropic(api_key, model, system_prompt, question, max_tokens=500, timeout=60):
+    """Stream an Anthropic completion with messages.stream"""
+    import anthropic
+
+    client = anthropic.Anthropic(api_key=api_key, timeout=timeout)
+    with client.messages.stream(
+        model=model,
+        max_tokens=max_tokens,
+        system=system_prompt,
+        messages=[{"role": "user", "content": question}],
+    ) as stream:
+        yield from stream.text_stream
@@ -0,0 +1,103 @@
+"""
+Play Table
+==========
+Server-side filtering, sorting and pagination; only the visible page is formatted and sent
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from context_builder import distance_bucket
+
+# Source columns kept for paging; wide text columns make row takes slow on large frames
+SOURCE_COLUMNS = ['QUARTER', 'TIME', 'YARDS_TO_GO', 'FIELD_POSITION', 'POSTEAM_SCORE', 'DEFTEAM_SCORE',
+                  'WIN_PROB_PCT', 'WPA_PCT', 'EPA', 'GRADE']
+
+# Filter name -> how to derive its value per play
+FILTERS = {
+    "team": lambda df: df["POSTEAM"].astype(str),
+    "quarter": lambda df: df["QUARTER"].astype(str),
+    "grade": lambda df: df["GRADE"].astype(str),
+    "distance": lambda df: pd.Series(distance_bucket(df["YARDS_TO_GO"].to_numpy()), index=df.index),
+}
+
+# Sort label -> source column; game order is the frame's own order
+SORTS = {
+    "Game order": None,
+    "Win prob": "WIN_PROB_PCT",
+    "WPA": "WPA_PCT",
+    "EPA": "EPA",
+    "WP cost": "WP_COST",
+    "Yards to go": "YARDS_TO_GO",
+}
+
+
+def format_page(plays):
+    """Display strings for a handful of rows"""
+    display_df = pd.DataFrame({
+        'SITUATION': 'Q' + plays['QUARTER'].astype(str) + ' ' + plays['TIME'].astype(str),
+        'DOWN_DIST': '4th & ' + plays['YARDS_TO_GO'].astype(str),
+        'FIELD_POSITION': plays['FIELD_POSITION'].astype(str),
+        'SCORE': plays['POSTEAM_SCORE'].astype(int).astype(str) + '-' + plays['DEFTEAM_SCORE'].astype(int).astype(str),
+    })
+    for col in ['WIN_PROB_PCT', 'WPA_PCT', 'EPA', 'GRADE']:
+        display_df[col] = plays[col].to_numpy()
+    return display_df
+
+
+def payload_bytes(df):
+    """Size of a frame as the Arrow IPC stream Streamlit sends to the browser"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+class PlayTable:
+    """Filter codes and sort orders computed once per dataset; queries are array operations"""
+
+    def __init__(self, plays):
+        plays = plays.reset_index(drop=True)
+        self.plays = plays[SOURCE_COLUMNS].copy()
+        self.codes = {}
+        self.options = {}
+        for name, derive in FILTERS.items():
+            codes, uniques = pd.factorize(derive(plays), sort=True)
+            self.codes[name] = codes
+            self.options[name] = list(uniques)
+        # Stable sorts keep game order among ties; missing values sort last either way
+        self.orders = {}
+        for label, col in SORTS.items():
+            if col is None:
+                game_order = np.arange(len(plays))
+                self.orders[label, True], self.orders[label, False] = game_order, game_order[::-1]
+            elif col in plays.columns:
+                values = plays[col].to_numpy(dtype=float, na_value=np.nan)
+                self.orders[label, True] = np.argsort(values, kind="stable")
+                self.orders[label, False] = np.argsort(-values, kind="stable")
+
+    def __len__(self):
+        return len(self.plays)
+
+    @property
+    def sorts(self):
+        return [label for label in SORTS if (label, True) in self.orders]
+
+    def matching(self, filters=None, sort="Game order", ascending=True):
+        """Row positions passing every filter, in sort order"""
+        mask = np.ones(len(self.plays), dtype=bool)
+        for name, selected in (filters or {}).items():
+            if not selected:
+                continue
+            allowed = np.zeros(len(self.options[name]), dtype=bool)
+            allowed[[self.options[name].index(v) for v in selected if v in self.options[name]]] = True
+            mask &= allowed[self.codes[name]]
+        order = self.orders[sort, ascending]
+        return order[mask[order]]
+
+    def page(self, rows, page=0, page_size=25):
+        """Formatted rows for one page of `matching` positions"""
+        start = page * page_size
+        return format_page(self.plays.iloc[rows[start:start + page_size]])
@@ -0,0 +1,365 @@
+"""
+Warehouse Pushdown
+==================
+The decision model, grade rules and header metrics compiled to SQL, so grading runs
+where the plays live and results stream back in Arrow batches.
+
+    python pushdown.py                      # parity check on the bundled sample
+    python pushdown.py --parquet pbp/ --seasons 2023 2024
+"""
+
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from data_sources import (FOURTH_DOWN_COLUMNS, NFLFASTR_COLUMNS, PERCENT_COLUMNS, SampleSource, SnowflakeSource,
+                          _to_app_frame)
+from decision_model import (GAME_POINTS_SIGMA, GAME_SECONDS, KICKOFF_YARDLINE, MAX_FG_DISTANCE, MODEL_GRADE_RULES,
+                            TOUCHBACK_YARDLINE, grade_plays, load_tables)
+from grading import COLUMN_DEFAULTS, DEFAULT_GRADE, grade_fourth_downs, validate_rules
+from schema import QUARTER_SECONDS, concat_plays, normalize_fourth_downs
+from snowflake_pool import ConnectionPool
+
+# Model columns in the order evaluate_decisions returns them
+MODEL_COLUMNS = ["CONV_PROB", "PUNT_NET_YARDS", "PUNT_OPP_YARDLINE", "FG_MAKE_PROB", "WP_GO", "WP_PUNT", "WP_FG",
+                 "BEST_DECISION", "ACTUAL_DECISION", "WP_COST"]
+GRADED_COLUMNS = FOURTH_DOWN_COLUMNS + ["YARDLINE_OWN", "GAME_SECONDS"] + MODEL_COLUMNS + ["GRADE"]
+
+LOOKUP_COLUMNS = ["conversion", "expected_points", "punt_net", "fg_make"]
+SQL_OPERATORS = {"==": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+# Grades counted as bad or questionable in the header
+FLAGGED_MARKS = ("🔴", "🟡")
+
+
+# ============================================
+# SQL BUILDING BLOCKS
+# ============================================
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def compile_rules(rules, columns, default=DEFAULT_GRADE, defaults=None):
+    """A grade rule table as a SQL CASE over `columns`; missing columns use their defaults like grading does"""
+    rules = validate_rules(rules)
+    defaults = COLUMN_DEFAULTS if defaults is None else {**COLUMN_DEFAULTS, **defaults}
+    whens = []
+    for rule in rules:
+        conditions = []
+        for col, op, value in rule["when"]:
+            if col in columns:
+                column = col
+            elif col in defaults:
+                column = _literal(defaults[col])
+            else:
+                raise ValueError(f"Rule column {col!r} is not available in the warehouse")
+            conditions.append(f"{column} {SQL_OPERATORS[op]} {_literal(value)}")
+        whens.append(f"WHEN {' AND '.join(conditions) or '1 = 1'} THEN {_literal(rule['grade'])}")
+    if not whens:
+        return _literal(default)
+    return f"CASE {' '.join(whens)} ELSE {_literal(default)} END"
+
+
+def _lookup_rows(tables):
+    """One VALUES row per yard; shorter tables repeat their last entry, as _lookup clamps"""
+    size = max(len(tables[name]) for name in LOOKUP_COLUMNS)
+    rows = []
+    for yard in range(size):
+        values = [repr(float(tables[name][min(yard, len(tables[name]) - 1)])) for name in LOOKUP_COLUMNS]
+        rows.append(f"({yard}, {', '.join(values)})")
+    return size, ",\n        ".join(rows)
+
+
+def _index(expr, size):
+    """Clamped integer table index, matching _lookup's nan -> 0 and clip"""
+    return (f"CASE WHEN {expr} IS NULL OR FLOOR({expr}) < 0 THEN 0 "
+            f"WHEN FLOOR({expr}) > {size - 1} THEN {size - 1} ELSE FLOOR({expr}) END")
+
+
+def _win_probability(x, t):
+    """100 * Phi(x) with the Abramowitz-Stegun erf; t = 1 / (1 + p|x|/sqrt(2)) from the previous step"""
+    poly = f"{t} * (0.254829592 + {t} * (-0.284496736 + {t} * (1.421413741 + {t} * (-1.453152027 + {t} * 1.061405429))))"
+    return f"100 * 0.5 * (1 + SIGN({x}) * (1 - {poly} * EXP(-{x} * {x} / 2.0)))"
+
+
+def _app_columns():
+    """nflfastR columns renamed to app columns, probabilities scaled to percent"""
+    selected = []
+    for source, app in NFLFASTR_COLUMNS.items():
+        column = '"DESC"' if source == "desc" else source
+        selected.append(f"{column} * 100 AS {app}" if app in PERCENT_COLUMNS else f"{column} AS {app}")
+    return ", ".join(selected)
+
+
+# ============================================
+# PUSHDOWN
+# ============================================
+class Pushdown:
+    """Grades and header metrics for a SnowflakeSource computed by the warehouse"""
+
+    def __init__(self, source, rules=MODEL_GRADE_RULES, tables=None, batch_rows=50_000):
+        self.source = source
+        self.rules = rules
+        self.tables = tables or load_tables()
+        self.batch_rows = batch_rows
+        self.cache_key = f"pushdown:{source.cache_key}"
+
+    def _graded_cte(self, seasons=(), game_ids=(), posteams=()):
+        """WITH clause ending in `graded`, one row per 4th down with the model columns and GRADE"""
+        raw_sql, params = self.source.build_query(seasons, game_ids, posteams)
+        size, lookup_rows = _lookup_rows(self.tables)
+        kickoff_ep = float(self.tables["expected_points"][KICKOFF_YARDLINE])
+        yard = "CAST(TRIM(SUBSTR(FIELD_POSITION, LENGTH(FIELD_POSITION) - 1)) AS INTEGER)"
+        clock = ("(CAST(SUBSTR(TIME, 1, LENGTH(TIME) - 3) AS INTEGER) * 60 "
+                 "+ CAST(SUBSTR(TIME, LENGTH(TIME) - 1) AS INTEGER))")
+        wps = {d: _win_probability(f"X_{d}", f"T_{d}") for d in ("GO", "PUNT", "FG")}
+        grade = compile_rules(self.rules, GRADED_COLUMNS)
+        sql = f"""
+    WITH lookup AS (
+        SELECT column1 AS yard, column2 AS conversion, column3 AS expected_points,
+               column4 AS punt_net, column5 AS fg_make
+        FROM (VALUES
+        {lookup_rows})
+    ),
+    raw AS ({raw_sql}),
+    plays AS (SELECT {_app_columns()} FROM raw),
+    situation AS (
+        SELECT plays.*,
+            CASE WHEN UPPER(FIELD_POSITION) LIKE 'OWN %' OR UPPER(FIELD_POSITION) LIKE UPPER(POSTEAM) || ' %'
+                      OR {yard} = 50 THEN {yard} ELSE 100 - {yard} END AS YARDLINE_OWN,
+            (QUARTER - 1) * {QUARTER_SECONDS} + ({QUARTER_SECONDS} - {clock}) AS GAME_SECONDS
+        FROM plays
+    ),
+    spots AS (
+        SELECT situation.*, 100 - YARDLINE_OWN AS TO_GOAL, {GAME_SECONDS} - GAME_SECONDS AS REMAINING,
+            CASE WHEN 100 - YARDLINE_OWN - YARDS_TO_GO < 1 THEN 1 ELSE 100 - YARDLINE_OWN - YARDS_TO_GO END AS AFTER_GAIN
+        FROM situation
+    ),
+    rates AS (
+        SELECT spots.*, conv.conversion AS CONV_PROB, gain.expected_points AS EP_GAIN,
+            fail.expected_points AS EP_FAIL, punt.punt_net AS PUNT_NET_YARDS, kick.fg_make AS FG_MAKE
+        FROM spots
+        LEFT JOIN lookup conv ON conv.yard = {_index("spots.YARDS_TO_GO", size)}
+        LEFT JOIN lookup gain ON gain.yard = {_index("spots.AFTER_GAIN", size)}
+        LEFT JOIN lookup fail ON fail.yard = {_index("100 - spots.TO_GOAL", size)}
+        LEFT JOIN lookup punt ON punt.yard = {_index("spots.TO_GOAL", size)}
+        LEFT JOIN lookup kick ON kick.yard = {_index("spots.TO_GOAL + 17", size)}
+    ),
+    kicks AS (
+        SELECT rates.*,
+            CASE WHEN TO_GOAL - PUNT_NET_YARDS < 20 THEN {TOUCHBACK_YARDLINE}
+                 ELSE 100 - (TO_GOAL - PUNT_NET_YARDS) END AS OPP_TO_GOAL,
+            CASE WHEN 100 - (TO_GOAL + 7) > {TOUCHBACK_YARDLINE} THEN {TOUCHBACK_YARDLINE}
+                 ELSE 100 - (TO_GOAL + 7) END AS MISS_TO_GOAL
+        FROM rates
+    ),
+    values_ AS (
+        SELECT kicks.*,
+            kicks.CONV_PROB * kicks.EP_GAIN - (1 - kicks.CONV_PROB) * kicks.EP_FAIL AS EV_GO,
+            -opp.expected_points AS EV_PUNT,
+            CASE WHEN kicks.TO_GOAL + 17 <= {MAX_FG_DISTANCE}
+                 THEN kicks.FG_MAKE * (3 - {kickoff_ep!r}) - (1 - kicks.FG_MAKE) * miss.expected_points END AS EV_FG,
+            {GAME_POINTS_SIGMA!r} * SQRT((CASE WHEN kicks.REMAINING < 30 THEN 30 ELSE kicks.REMAINING END)
+                                         / {float(GAME_SECONDS)!r}) AS SIGMA
+        FROM kicks
+        LEFT JOIN lookup opp ON opp.yard = {_index("kicks.OPP_TO_GOAL", size)}
+        LEFT JOIN lookup miss ON miss.yard = {_index("kicks.MISS_TO_GOAL", size)}
+    ),
+    scaled AS (
+        SELECT values_.*, (SCORE_DIFFERENTIAL + EV_GO) / SIGMA AS X_GO, (SCORE_DIFFERENTIAL + EV_PUNT) / SIGMA AS X_PUNT,
+            (SCORE_DIFFERENTIAL + EV_FG) / SIGMA AS X_FG
+        FROM values_
+    ),
+    terms AS (
+        SELECT scaled.*, 1 / (1 + 0.3275911 * ABS(X_GO) / SQRT(2.0)) AS T_GO,
+            1 / (1 + 0.3275911 * ABS(X_PUNT) / SQRT(2.0)) AS T_PUNT, 1 / (1 + 0.3275911 * ABS(X_FG) / SQRT(2.0)) AS T_FG
+        FROM scaled
+    ),
+    probabilities AS (
+        SELECT terms.*, {wps["GO"]} AS WP_GO, {wps["PUNT"]} AS WP_PUNT, {wps["FG"]} AS WP_FG
+        FROM terms
+    ),
+    decisions AS (
+        SELECT probabilities.*,
+            100 - OPP_TO_GOAL AS PUNT_OPP_YARDLINE,
+            CASE WHEN TO_GOAL + 17 <= {MAX_FG_DISTANCE} THEN FG_MAKE END AS FG_MAKE_PROB,
+            CASE WHEN COALESCE(WP_GO, -1) >= COALESCE(WP_PUNT, -1) AND COALESCE(WP_GO, -1) >= COALESCE(WP_FG, -1) THEN 'go'
+                 WHEN COALESCE(WP_PUNT, -1) >= COALESCE(WP_FG, -1) THEN 'punt' ELSE 'fg' END AS BEST_DECISION,
+            CASE WHEN PUNT_ATTEMPT = 1 OR LOWER(PLAY_TYPE) = 'punt' THEN 'punt'
+                 WHEN LOWER(PLAY_TYPE) = 'field_goal' THEN 'fg' ELSE 'go' END AS ACTUAL_DECISION
+        FROM probabilities
+    ),
+    costs AS (
+        SELECT decisions.*,
+            COALESCE(CASE BEST_DECISION WHEN 'go' THEN WP_GO WHEN 'punt' THEN WP_PUNT ELSE WP_FG END
+                     - CASE ACTUAL_DECISION WHEN 'go' THEN WP_GO WHEN 'punt' THEN WP_PUNT ELSE WP_FG END, 0) AS WP_COST
+        FROM decisions
+    ),
+    graded AS (SELECT costs.*, {grade} AS GRADE FROM costs)"""
+        return sql, params
+
+    def graded_query(self, seasons=(), game_ids=(), posteams=()):
+        """Every graded 4th down in game order"""
+        cte, params = self._graded_cte(seasons, game_ids, posteams)
+        return f"{cte}\n    SELECT {', '.join(GRADED_COLUMNS)} FROM graded ORDER BY GAME_ID, GAME_SECONDS", params
+
+    def metrics_query(self, seasons=(), game_ids=(), posteams=()):
+        """Per-grade play, punt, WPA and EPA totals; one small row per grade"""
+        cte, params = self._graded_cte(seasons, game_ids, posteams)
+        return f"""{cte}
+    SELECT GRADE, COUNT(*) AS PLAYS,
+        SUM(CASE WHEN PUNT_ATTEMPT = 1 THEN 1 ELSE 0 END) AS PUNTS,
+        SUM(CASE WHEN PUNT_ATTEMPT = 1 THEN WPA_PCT END) AS WPA,
+        SUM(CASE WHEN PUNT_ATTEMPT = 1 THEN EPA END) AS EPA
+    FROM graded GROUP BY GRADE""", params
+
+    def _stream(self, sql, params, on_batch):
+        def fetch(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                for batch in _fetch_batches(cursor, self.batch_rows):
+                    on_batch(batch)
+            finally:
+                cursor.close()
+
+        self.source.pool.run(fetch)
+
+    def load(self, seasons=(), game_ids=(), posteams=()):
+        """Graded plays, narrowed batch by batch so only the compact frame is ever held whole"""
+        batches = []
+        self._stream(*self.graded_query(seasons, game_ids, posteams),
+                     lambda batch: batches.append(normalize_fourth_downs(_upper_columns(batch))))
+        if not batches:
+            return pd.DataFrame(columns=GRADED_COLUMNS)
+        return concat_plays(batches)
+
+    def metrics(self, seasons=(), game_ids=(), posteams=()):
+        """Header metrics and grade counts, aggregated in the warehouse"""
+        rows = []
+        self._stream(*self.metrics_query(seasons, game_ids, posteams),
+                     lambda batch: rows.append(_upper_columns(batch)))
+        totals = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(
+            columns=["GRADE", "PLAYS", "PUNTS", "WPA", "EPA"])
+        flagged = totals["GRADE"].astype(str).str.contains("|".join(FLAGGED_MARKS))
+        return {
+            "punts": int(totals["PUNTS"].fillna(0).sum()),
+            "bad_decisions": int(totals.loc[flagged, "PLAYS"].sum()),
+            "total_wpa": float(totals["WPA"].astype(float).sum()),
+            "total_epa": float(totals["EPA"].astype(float).sum()),
+            "grade_counts": {str(g): int(n) for g, n in zip(totals["GRADE"], totals["PLAYS"])},
+        }
+
+
+def _upper_columns(df):
+    df.columns = [str(c).upper() for c in df.columns]
+    return df
+
+
+def _fetch_batches(cursor, size):
+    """Arrow-backed pandas batches from Snowflake; fetchmany pages from DB-API cursors without it"""
+    if hasattr(cursor, "fetch_pandas_batches"):
+        yield from cursor.fetch_pandas_batches()
+        return
+    columns = [d[0] for d in cursor.description]
+    while rows := cursor.fetchmany(size):
+        yield pd.DataFrame(rows, columns=columns)
+
+
+# ============================================
+# LOCAL REFERENCE
+# ============================================
+def play_metrics(plays):
+    """Header metrics from graded plays in pandas; the pushdown metrics must match these"""
+    punts = plays[plays["PUNT_ATTEMPT"] == 1]
+    return {
+        "punts": len(punts),
+        "bad_decisions": int(plays["GRADE"].str.contains("|".join(FLAGGED_MARKS)).sum()),
+        "total_wpa": float(punts["WPA_PCT"].sum()),
+        "total_epa": float(punts["EPA"].sum()),
+        "grade_counts": {str(g): int(n) for g, n in plays["GRADE"].value_counts().items()},
+    }
+
+
+def to_nflfastr(plays):
+    """App-shaped 4th downs back to nflfastR columns (down = 4, probabilities 0-1)"""
+    raw = plays[[c for c in FOURTH_DOWN_COLUMNS if c in plays.columns]].rename(
+        columns={app: source for source, app in NFLFASTR_COLUMNS.items()})
+    for source, app in NFLFASTR_COLUMNS.items():
+        if app in PERCENT_COLUMNS and source in raw.columns:
+            raw[source] = raw[source] / 100
+    raw["down"] = 4
+    return raw
+
+
+def parity_check(raw, rules=MODEL_GRADE_RULES, atol=1e-6):
+    """Grade nflfastR-shaped plays through SQLite and through pandas, and report any disagreement"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    raw.to_sql("pbp", conn, index=False)
+    pushdown = Pushdown(SnowflakeSource(ConnectionPool(lambda: conn, max_size=1), "pbp"), rules=rules)
+    remote = pushdown.load()
+    remote_metrics = pushdown.metrics()
+
+    local = grade_plays(normalize_fourth_downs(_to_app_frame(raw[raw["down"] == 4])))
+    local["GRADE"] = grade_fourth_downs(local, rules=rules)
+    local = local.sort_values(["GAME_ID", "GAME_SECONDS"], kind="stable").reset_index(drop=True)
+    local_metrics = play_metrics(local)
+    conn.close()
+
+    report = {"plays": (len(local), len(remote)), "columns": {}}
+    if len(local) == len(remote):
+        for col in MODEL_COLUMNS + ["YARDLINE_OWN", "GAME_SECONDS"]:
+            a, b = local[col], remote[col]
+            if a.dtype.kind in "fiu":
+                diff = np.nanmax(np.abs(a.to_numpy(float) - b.to_numpy(float)), initial=0)
+                same_nan = (a.isna() == b.isna()).all()
+                report["columns"][col] = float(diff) if same_nan else float("inf")
+            else:
+                report["columns"][col] = int((a.astype(str).to_numpy() != b.astype(str).to_numpy()).sum())
+        report["grade_mismatches"] = int((local["GRADE"].to_numpy() != remote["GRADE"].to_numpy()).sum())
+    report["metrics"] = {key: (local_metrics[key], remote_metrics[key]) for key in local_metrics}
+    report["ok"] = (
+        len(local) == len(remote)
+        and report["grade_mismatches"] == 0
+        and all(v <= atol for v in report["columns"].values())
+        and local_metrics["grade_counts"] == remote_metrics["grade_counts"]
+        and all(np.isclose(local_metrics[k], remote_metrics[k], atol=1e-3)
+                for k in ("punts", "bad_decisions", "total_wpa", "total_epa"))
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parquet", help="nflfastR play-by-play Parquet file or directory (default: bundled sample)")
+    parser.add_argument("--seasons", type=int, nargs="*", default=())
+    args = parser.parse_args()
+
+    if args.parquet:
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(args.parquet, format="parquet", partitioning="hive")
+        expr = ds.field("down") == 4
+        if args.seasons:
+            expr &= ds.field("season").isin(args.seasons)
+        columns = [c for c in [*NFLFASTR_COLUMNS, "down"] if c in dataset.schema.names]
+        raw = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    else:
+        raw = to_nflfastr(SampleSource().load())
+
+    report = parity_check(raw)
+    print(f"plays (pandas, sql): {report['plays']}")
+    for col, diff in report["columns"].items():
+        print(f"  {col:<18} {diff}")
+    print(f"grade mismatches: {report.get('grade_mismatches')}")
+    for key, (local, remote) in report["metrics"].items():
+        print(f"  {key:<14} pandas={local}  sql={remote}")
+    print("PARITY OK" if report["ok"] else "PARITY FAILED")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,266 @@
+"""
+Question Similarity Index
+=========================
+Near-duplicate lookup over answered questions: hashed character n-gram TF-IDF with cosine search,
+over canonical words (team names, decision synonyms), gated by what the questions must agree on
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+from answer_cache import normalize_question
+from schema import TEAM_NAME_PATTERN, TEAM_NAMES, find_teams
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "questions.sqlite")
+
+DIMENSIONS = 256
+NGRAM_SIZES = (3, 4, 5)
+STEM_LENGTH = 4
+STOPWORDS = {"what", "which", "when", "where", "does", "have", "that", "this", "with", "from", "they",
+             "their", "there", "about", "would", "should", "could", "were", "been", "much", "many", "team",
+             "the", "was", "and", "why", "did", "for", "has", "had", "are", "how", "who", "its", "all", "you",
+             "game", "down", "downs", "think", "explain", "tell"}
+# Stored vectors are rebuilt from the question text when the feature set changes
+FEATURE_VERSION = 3
+# Re-weight stored vectors once the corpus has grown this much since the last IDF snapshot
+REWEIGHT_GROWTH = 1.1
+# Below this many questions IDF is noise, so vectors are plain term counts
+MIN_IDF_QUESTIONS = 20
+# Topic words two questions must share (Jaccard over stems) to count as the same question
+MIN_TOPIC_OVERLAP = 0.5
+
+# ============================================
+# CANONICAL WORDS (paraphrases map to the same tokens; the signature keeps what must still agree)
+# ============================================
+DECISIONS = {
+    "go": "go", "goes": "go", "going": "go", "gone": "go", "went": "go",
+    "punt": "punt", "punts": "punt", "punted": "punt", "punting": "punt",
+    "fg": "fg", "kick": "fg", "kicks": "fg", "kicked": "fg", "kicking": "fg",
+}
+CALL_WORDS = {"call", "calls", "decision", "decisions", "choice", "choices", "play", "plays", "playcall"}
+POLARITY = {
+    "worst": "-", "bad": "-", "wrong": "-", "terrible": "-", "mistake": "-", "mistakes": "-", "costliest": "-",
+    "dumbest": "-", "best": "+", "good": "+", "right": "+", "smart": "+", "smartest": "+", "correct": "+",
+}
+
+
+def _canonical(question):
+    """(tokens, facets): canonical words for vectors, and what two near-duplicates must agree on"""
+    teams = {team.lower() for team in find_teams(question)}
+    text = normalize_question(question)
+    # The whole app is about 4th downs, so "4th down" / "4th &" adds nothing; "4th quarter" keeps its number
+    text = re.sub(r"\b(?:4th|fourth)\s*(?=&|(?:down|downs|and)\b)", "", text)
+    text = TEAM_NAME_PATTERN.sub(lambda m: TEAM_NAMES[m.group().lower()].lower(), text.replace("field goal", "fg"))
+    tokens, numbers, polarity, decisions, topic = [], [], set(), set(), set()
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word.isdigit() or re.fullmatch(r"\d+(?:st|nd|rd|th)", word):
+            numbers.append(re.match(r"\d+", word).group())
+            tokens.append(word)
+        elif word in teams:
+            tokens.append(word)
+        elif word in DECISIONS or word in CALL_WORDS:
+            if word in DECISIONS:
+                decisions.add(DECISIONS[word])
+            topic.add("call")
+            tokens.append("call")
+        elif word in POLARITY:
+            polarity.add(POLARITY[word])
+            tokens.append(word)
+        elif len(word) >= 3 and word not in STOPWORDS:
+            if len(word) >= STEM_LENGTH:
+                topic.add(word[:STEM_LENGTH])
+            tokens.append(word)
+    facets = {"numbers": tuple(numbers), "polarity": frozenset(polarity), "teams": frozenset(teams),
+              "decisions": frozenset(decisions), "topic": frozenset(topic)}
+    return tokens, facets
+
+
+def features(question):
+    """Character n-grams plus whole words of the canonical question; word order and repeats are ignored"""
+    words = sorted(set(_canonical(question)[0]))
+    padded = f" {' '.join(words)} "
+    grams = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    return grams + [f"w:{w}" for w in words]
+
+
+def hash_vector(question, dimensions=DIMENSIONS):
+    """Sublinear term counts hashed into a signed vector (crc32, so stable across processes)"""
+    vec = np.zeros(dimensions, dtype=np.float32)
+    for feature in features(question):
+        h = zlib.crc32(feature.encode())
+        vec[h % dimensions] += 1.0 if (h >> 16) & 1 else -1.0
+    return np.sign(vec) * np.log1p(np.abs(vec))
+
+
+def signature(question):
+    """What a near-duplicate has to agree on beyond vector similarity (see same_question)"""
+    return _canonical(question)[1]
+
+
+def same_question(a, b):
+    """Signatures that can share an answer.
+
+    Numbers and best/worst must match: character n-grams alone rate '4th & 1' close to '4th & 2' and
+    'best call' close to 'worst call'. Teams and go/punt/FG must match only when both name them, and
+    the topic words must mostly overlap ('worst call' vs 'which punt was worst' vs 'worst decision').
+    """
+    if a["numbers"] != b["numbers"] or a["polarity"] != b["polarity"]:
+        return False
+    for facet in ("teams", "decisions"):
+        if a[facet] and b[facet] and a[facet] != b[facet]:
+            return False
+    union = a["topic"] | b["topic"]
+    return not union or len(a["topic"] & b["topic"]) / len(union) >= MIN_TOPIC_OVERLAP
+
+
+def _grow(array, needed):
+    """Amortized append: double the row capacity when full"""
+    if needed <= len(array):
+        return array
+    grown = np.zeros((max(needed, 2 * len(array), 64), *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _Shard:
+    """Questions answered on one dataset, with their raw and TF-IDF weighted vectors"""
+
+    def __init__(self, dimensions):
+        self.questions = []
+        self.tf = np.zeros((0, dimensions), dtype=np.float32)
+        self.weights = np.zeros((0, dimensions), dtype=np.float32)
+
+    def append(self, question, tf, weighted):
+        i = len(self.questions)
+        self.questions.append(question)
+        self.tf = _grow(self.tf, i + 1)
+        self.weights = _grow(self.weights, i + 1)
+        self.tf[i] = tf
+        self.weights[i] = weighted
+
+    def reweight(self, idf):
+        n = len(self.questions)
+        weighted = self.tf[:n] * idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        self.weights[:n] = weighted / np.where(norms == 0, 1, norms)
+
+
+def _weighted_row(tf, idf):
+    row = tf * idf
+    norm = np.linalg.norm(row)
+    return row / norm if norm else row
+
+
+class QuestionIndex:
+    """Answered questions sharded by data fingerprint; stored in SQLite, searched in memory"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, dimensions=DIMENSIONS):
+        self.path = path
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                normalized TEXT,
+                fingerprint TEXT,
+                question TEXT,
+                vector BLOB,
+                PRIMARY KEY (normalized, fingerprint)
+            )
+        """)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != FEATURE_VERSION:
+            # Vectors from another feature set are not comparable; rebuild them from the stored text
+            rows = self._conn.execute("SELECT rowid, question FROM questions").fetchall()
+            self._conn.executemany("UPDATE questions SET vector = ? WHERE rowid = ?",
+                                   [(hash_vector(question, dimensions).tobytes(), rowid) for rowid, question in rows])
+            self._conn.execute(f"PRAGMA user_version = {FEATURE_VERSION}")
+        self._conn.commit()
+
+        self._shards = {}
+        self._seen = set()
+        self.matches = 0
+        self._count = 0
+        # Document frequency per hashed dimension across every shard
+        self._df = np.zeros(dimensions, dtype=np.float32)
+        self._idf = np.ones(dimensions, dtype=np.float32)
+        for normalized, fingerprint, question, blob in self._conn.execute(
+            "SELECT normalized, fingerprint, question, vector FROM questions ORDER BY rowid"
+        ):
+            self._insert(normalized, fingerprint, question, np.frombuffer(blob, dtype=np.float32))
+        self._reweight()
+
+    def __len__(self):
+        return self._count
+
+    def _insert(self, normalized, fingerprint, question, tf):
+        shard = self._shards.setdefault(fingerprint, _Shard(self.dimensions))
+        # New rows use the IDF snapshot the rest of the corpus is weighted with
+        shard.append(question, tf, _weighted_row(tf, self._idf))
+        self._seen.add((normalized, fingerprint))
+        self._df += tf != 0
+        self._count += 1
+
+    def _reweight(self):
+        """Refresh the IDF snapshot and re-weight every stored vector with it"""
+        if self._count >= MIN_IDF_QUESTIONS:
+            self._idf = (np.log((1 + self._count) / (1 + self._df)) + 1).astype(np.float32)
+        for shard in self._shards.values():
+            shard.reweight(self._idf)
+        self._reweighted_at = max(self._count, 1)
+
+    def add(self, question, fingerprint):
+        """Index an answered question; repeats of the same normalized question are ignored"""
+        normalized = normalize_question(question)
+        tf = hash_vector(question, self.dimensions)
+        with self._lock:
+            if (normalized, fingerprint) in self._seen:
+                return False
+            self._conn.execute(
+                "INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?)",
+                (normalized, fingerprint, str(question), tf.tobytes()),
+            )
+            self._conn.commit()
+            self._insert(normalized, fingerprint, str(question), tf)
+            if self._count > self._reweighted_at * REWEIGHT_GROWTH:
+                self._reweight()
+        return True
+
+    # --------------------------------------------
+    # Search
+    # --------------------------------------------
+    def search(self, question, fingerprint, k=1):
+        """[(stored question, cosine similarity)] for the k closest questions on the same data"""
+        query = hash_vector(question, self.dimensions)
+        with self._lock:
+            shard = self._shards.get(fingerprint)
+            if shard is None or not shard.questions:
+                return []
+            n = len(shard.questions)
+            scores = shard.weights[:n] @ _weighted_row(query, self._idf)
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(shard.questions[i], float(scores[i])) for i in top]
+
+    def record_match(self):
+        """Count a near-duplicate that was answered from the cache"""
+        with self._lock:
+            self.matches += 1
+
+    def best_match(self, question, fingerprint, threshold, k=5):
+        """The closest stored question that clears the threshold with a compatible signature, else None"""
+        wanted = signature(question)
+        for match, score in self.search(question, fingerprint, k=k):
+            if score < threshold:
+                break
+            if same_question(signature(match), wanted):
+                return match, score
+        return None
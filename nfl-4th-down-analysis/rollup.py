@@ -0,0 +1,296 @@
+"""
+League Rollups
+==============
+Additive 4th-down cubes (team x season x distance x field x score state) stored as Parquet.
+New or changed games are graded and folded in; dashboards and prompts read the cube, not raw plays.
+
+    python rollup.py --secrets .streamlit/secrets.toml           # new and changed games, latest season on
+    python rollup.py --secrets .streamlit/secrets.toml --full    # recheck every season in [rollup]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from context_builder import distance_bucket, field_bucket, parse_question, score_bucket
+from decision_model import MODEL_GRADE_RULES, grade_plays, load_tables
+from pushdown import FLAGGED_MARKS
+from schema import normalize_fourth_downs
+from shared_cache import file_lock
+
+DEFAULT_ROLLUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "rollups")
+
+CUBE_DIMENSIONS = ["POSTEAM", "SEASON", "DISTANCE", "FIELD", "SCORE_STATE"]
+# Every measure is a count or a sum, so cells from new games add onto the stored cube.
+# Cells are stored per game as well, so a game whose plays change can be swapped out.
+MEASURES = ["PLAYS", "GO", "PUNTS", "FGS", "GO_ADVISED", "FLAGGED", "WP_COST", "WPA", "EPA"]
+
+DISTANCES = ["short", "medium", "long"]
+FIELDS = ["own", "opponent", "redzone"]
+SCORE_STATES = ["trailing_big", "trailing", "tied", "leading"]
+# Bumped when the stored layout changes; older directories are rebuilt
+CUBE_FORMAT = 2
+# Replicas refreshing the same cube take turns; a wait this long means the holder is stuck
+REFRESH_LOCK_TIMEOUT = 600
+
+
+def model_signature(rules=MODEL_GRADE_RULES, tables=None):
+    """Changes whenever grading would; a cube built under another signature is rebuilt"""
+    tables = tables or load_tables()
+    h = hashlib.sha256(json.dumps(rules, sort_keys=True, ensure_ascii=False).encode())
+    for name in sorted(tables):
+        h.update(np.ascontiguousarray(tables[name]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def game_cells(plays):
+    """Measures per (game, cube cell) for graded plays"""
+    season = plays["SEASON"].fillna(0).astype(int).to_numpy() if "SEASON" in plays.columns else 0
+    actual = plays["ACTUAL_DECISION"].astype(str).to_numpy()
+    cells = pd.DataFrame({
+        "GAME_ID": plays["GAME_ID"].astype(str).to_numpy(),
+        "POSTEAM": plays["POSTEAM"].astype(str).to_numpy(),
+        "SEASON": season,
+        "DISTANCE": distance_bucket(plays["YARDS_TO_GO"].to_numpy()),
+        "FIELD": field_bucket(plays),
+        "SCORE_STATE": score_bucket(plays["SCORE_DIFFERENTIAL"].to_numpy()),
+        "PLAYS": 1,
+        "GO": actual == "go",
+        "PUNTS": actual == "punt",
+        "FGS": actual == "fg",
+        "GO_ADVISED": plays["BEST_DECISION"].astype(str).to_numpy() == "go",
+        "FLAGGED": plays["GRADE"].astype(str).str.contains("|".join(FLAGGED_MARKS)).to_numpy(),
+        "WP_COST": plays["WP_COST"].to_numpy(dtype=float, na_value=0),
+        "WPA": plays["WPA_PCT"].to_numpy(dtype=float, na_value=0),
+        "EPA": plays["EPA"].to_numpy(dtype=float, na_value=0),
+    })
+    return _combine([cells], ["GAME_ID"] + CUBE_DIMENSIONS)
+
+
+def game_digests(plays):
+    """Order-independent content hash of each game's plays, keyed by GAME_ID"""
+    rows = pd.Series(pd.util.hash_pandas_object(plays, index=False).to_numpy(), index=plays["GAME_ID"].astype(str))
+    # Summing wraps modulo 2**64, which is fine for change detection
+    return rows.groupby(level=0, sort=False).sum().map("{:016x}".format)
+
+
+def _combine(frames, dims=CUBE_DIMENSIONS):
+    cells = pd.concat(frames, ignore_index=True)
+    return cells.groupby(dims, as_index=False, sort=True)[MEASURES].sum()
+
+
+def with_rates(cells):
+    """Go rate, model go rate and WP given up per play for aggregated cells"""
+    cells = cells.copy()
+    plays = cells["PLAYS"].where(cells["PLAYS"] > 0)
+    cells["GO_RATE"] = cells["GO"] / plays
+    cells["GO_ADVISED_RATE"] = cells["GO_ADVISED"] / plays
+    cells["WP_COST_PER_PLAY"] = cells["WP_COST"] / plays
+    return cells
+
+
+def _write_parquet(df, path):
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class LeagueRollup:
+    """Cube, folded-in games and model signature for one play source and query, under one directory"""
+
+    def __init__(self, path, signature=None):
+        self.path = path
+        self.signature = signature or model_signature()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self.cells = pd.DataFrame(columns=["GAME_ID"] + CUBE_DIMENSIONS + MEASURES)
+        self.cube = pd.DataFrame(columns=CUBE_DIMENSIONS + MEASURES)
+        self.games = pd.DataFrame(columns=["GAME_ID", "SEASON", "POSTEAM", "DIGEST"])
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("signature") == self.signature and meta.get("format") == CUBE_FORMAT:
+                self.cells = pd.read_parquet(os.path.join(self.path, "cells.parquet"))
+                self.cube = pd.read_parquet(os.path.join(self.path, "cube.parquet"))
+                self.games = pd.read_parquet(os.path.join(self.path, "games.parquet"))
+
+    def _locked(self):
+        """Exclusive across processes sharing the directory; the caller re-reads what others wrote"""
+        return file_lock(os.path.join(self.path, "refresh.lock"), timeout=REFRESH_LOCK_TIMEOUT)
+
+    @classmethod
+    def for_source(cls, cache_key, query=None, root=DEFAULT_ROLLUP_DIR):
+        """Rollup for a source and its load() filters; different filters never share a cube"""
+        key = json.dumps([cache_key, {name: list(values) for name, values in sorted((query or {}).items())}])
+        return cls(os.path.join(root, hashlib.sha256(key.encode()).hexdigest()[:16]))
+
+    def __len__(self):
+        return int(self.cube["PLAYS"].sum()) if len(self.cube) else 0
+
+    @property
+    def game_ids(self):
+        return set(self.games["GAME_ID"].astype(str))
+
+    # --------------------------------------------
+    # Refresh
+    # --------------------------------------------
+    def stale_games(self, digests):
+        """GAME_IDs in `digests` that are new or whose plays changed since they were folded in"""
+        stored = self.games.drop_duplicates("GAME_ID").set_index("GAME_ID")["DIGEST"].reindex(digests.index)
+        return set(digests.index[(digests != stored).to_numpy()])
+
+    def refresh(self, plays, digests=None):
+        """Fold in graded plays from games that are new or changed; returns the number of games (re)folded"""
+        with self._locked():
+            self._load()
+            return self._fold(plays, digests)
+
+    def _fold(self, plays, digests=None):
+        digests = game_digests(plays) if digests is None else digests
+        stale = self.stale_games(digests)
+        if not stale:
+            return 0
+        plays = plays[plays["GAME_ID"].astype(str).isin(stale)]
+        # Changed games are swapped out whole, so replaying a game never double counts it
+        kept = self.cells[~self.cells["GAME_ID"].astype(str).isin(stale)]
+        self.cells = _combine(([kept] if len(kept) else []) + [game_cells(plays)], ["GAME_ID"] + CUBE_DIMENSIONS)
+        self.cube = _combine([self.cells])
+        # One row per (game, team with the ball) so games per team can be counted
+        games = pd.DataFrame({
+            "GAME_ID": plays["GAME_ID"].astype(str).to_numpy(),
+            "SEASON": plays["SEASON"].fillna(0).astype(int).to_numpy() if "SEASON" in plays.columns else 0,
+            "POSTEAM": plays["POSTEAM"].astype(str).to_numpy(),
+        }).drop_duplicates()
+        games["DIGEST"] = digests.reindex(games["GAME_ID"]).to_numpy()
+        kept = self.games[~self.games["GAME_ID"].astype(str).isin(stale)]
+        self.games = pd.concat([kept, games], ignore_index=True) if len(kept) else games
+        self._save()
+        return len(stale)
+
+    def refresh_source(self, source, seasons=(), game_ids=(), posteams=(), full=False):
+        """Load raw plays, then grade only the games the cube has not seen or that changed.
+
+        Earlier seasons are settled, so once the cube has plays only its latest season onwards is
+        loaded from the source (within `seasons`); full=True reloads everything the query covers.
+        """
+        with self._locked():
+            # Another replica may have refreshed while this one waited
+            self._load()
+            latest = int(self.games["SEASON"].max()) if len(self.games) else 0
+            if not full and latest:
+                recent = range(latest, max(latest, datetime.date.today().year) + 1)
+                seasons = [season for season in seasons if season >= latest] if seasons else list(recent)
+                if not seasons:
+                    return 0
+            raw = source.load(seasons=seasons, game_ids=game_ids, posteams=posteams)
+            if raw.empty:
+                return 0
+            digests = game_digests(raw)
+            raw = raw[raw["GAME_ID"].astype(str).isin(self.stale_games(digests))]
+            if raw.empty:
+                return 0
+            return self._fold(grade_plays(normalize_fourth_downs(raw)), digests)
+
+    def _save(self):
+        _write_parquet(self.cells, os.path.join(self.path, "cells.parquet"))
+        _write_parquet(self.cube, os.path.join(self.path, "cube.parquet"))
+        _write_parquet(self.games, os.path.join(self.path, "games.parquet"))
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"signature": self.signature, "format": CUBE_FORMAT, "games": len(self.game_ids),
+                       "plays": len(self)}, f)
+
+    # --------------------------------------------
+    # Reads
+    # --------------------------------------------
+    def summary(self, by, **filters):
+        """Measures and rates grouped by cube dimensions, over cells matching filters (value or list)"""
+        cells = self.cube
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cells = cells[cells[dim].isin(list(values))]
+        if not by:
+            return with_rates(cells[MEASURES].sum().to_frame().T)
+        return with_rates(cells.groupby(list(by), as_index=False, sort=True)[MEASURES].sum())
+
+    def team_summary(self):
+        """Per team: games, go rate and WP given up per game, ranked worst first"""
+        teams = self.summary(["POSTEAM"])
+        games = self.games.groupby("POSTEAM")["GAME_ID"].nunique().rename("GAMES")
+        teams = teams.merge(games, left_on="POSTEAM", right_index=True, how="left")
+        teams["WP_COST_PER_GAME"] = teams["WP_COST"] / teams["GAMES"].where(teams["GAMES"] > 0)
+        teams = teams.sort_values("WP_COST_PER_GAME", ascending=False, kind="stable").reset_index(drop=True)
+        teams["RANK"] = np.arange(1, len(teams) + 1)
+        return teams
+
+    def compare(self, team, by=("DISTANCE",)):
+        """Team vs league go rates and WP given up per play, by the given dimensions"""
+        league = self.summary(by)
+        mine = self.summary(by, POSTEAM=team)
+        keep = list(by) + ["PLAYS", "GO_RATE", "GO_ADVISED_RATE", "WP_COST_PER_PLAY"]
+        return mine[keep].merge(league[keep], on=list(by), how="right", suffixes=("_TEAM", "_LEAGUE"))
+
+
+def league_context(rollup, question, max_lines=6):
+    """A few lines of league norms for the situations the question mentions"""
+    if rollup is None or not len(rollup):
+        return ""
+    query = parse_question(question)
+    filters = {}
+    if "yards" in query:
+        filters["DISTANCE"] = [str(distance_bucket(np.array([query["yards"]]))[0])]
+    elif "distance" in query:
+        filters["DISTANCE"] = sorted(query["distance"])
+    if "field" in query:
+        filters["FIELD"] = sorted(query["field"])
+    if "score" in query:
+        filters["SCORE_STATE"] = sorted(query["score"])
+    by = [dim for dim in ("DISTANCE", "FIELD", "SCORE_STATE") if dim in filters] or ["DISTANCE"]
+    rows = rollup.summary(by, **filters).sort_values("PLAYS", ascending=False).head(max_lines)
+    lines = [
+        f"- {' / '.join(str(row[d]) for d in by)}: teams went for it {row['GO_RATE']:.0%} of {int(row['PLAYS'])} "
+        f"plays, model says go {row['GO_ADVISED_RATE']:.0%}, avg WP given up {row['WP_COST_PER_PLAY']:.2f}%"
+        for _, row in rows.iterrows()
+    ]
+    seasons = sorted(rollup.games["SEASON"].unique())
+    span = f"{seasons[0]}-{seasons[-1]}" if len(seasons) > 1 else str(seasons[0])
+    return f"League 4th-down norms ({len(rollup.game_ids)} games, {span}):\n" + "\n".join(lines)
+
+
+def main():
+    import tomllib
+
+    from data_sources import query_from_config, source_from_config
+    from snowflake_pool import pool_from_config
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--full", action="store_true", help="reload every season the query covers, not just the latest")
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+    # [rollup] takes the same keys as [data] and names the league-wide plays to compare against
+    config = secrets.get("rollup")
+    if not config:
+        parser.error(f"no [rollup] section in {args.secrets}")
+    pool = pool_from_config(secrets["snowflake"]) if config.get("source") == "snowflake" else None
+    source = source_from_config(config, pool)
+    query = query_from_config(config)
+    rollup = LeagueRollup.for_source(source.cache_key, query)
+    new_games = rollup.refresh_source(source, **query, full=args.full)
+    print(f"{new_games} new or changed games folded in; cube has {len(rollup.cube)} cells, "
+          f"{len(rollup.game_ids)} games, {len(rollup)} plays at {rollup.path}")
+    if pool is not None:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
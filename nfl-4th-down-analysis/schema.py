@@ -0,0 +1,134 @@
+"""
+Play Schema
+===========
+Vectorized parsing of field position and clock, narrow dtypes, and team names
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+QUARTER_SECONDS = 900
+
+# Target dtype per column; integer columns fall back to nullable types when values are missing
+COLUMN_DTYPES = {
+    "SEASON": "int16",
+    "QUARTER": "int8",
+    "DOWN": "int8",
+    "YARDS_TO_GO": "int8",
+    "POSTEAM_SCORE": "int16",
+    "DEFTEAM_SCORE": "int16",
+    "SCORE_DIFFERENTIAL": "int16",
+    "PUNT_ATTEMPT": "int8",
+    "YARDLINE_OWN": "int8",
+    "GAME_SECONDS": "int16",
+    "WIN_PROB_PCT": "float32",
+    "WPA_PCT": "float32",
+    "EPA": "float32",
+    "GAME_ID": "category",
+    "POSTEAM": "category",
+    "DEFTEAM": "category",
+    "PLAY_TYPE": "category",
+    "TIME": "category",
+    "FIELD_POSITION": "category",
+}
+
+# Team nicknames and unambiguous cities (lowercase) to the POSTEAM / DEFTEAM abbreviation
+TEAM_NAMES = {
+    "cardinals": "ARI", "arizona": "ARI", "falcons": "ATL", "atlanta": "ATL", "ravens": "BAL", "baltimore": "BAL",
+    "bills": "BUF", "buffalo": "BUF", "panthers": "CAR", "carolina": "CAR", "bears": "CHI", "chicago": "CHI",
+    "bengals": "CIN", "cincinnati": "CIN", "browns": "CLE", "cleveland": "CLE", "cowboys": "DAL", "dallas": "DAL",
+    "broncos": "DEN", "denver": "DEN", "lions": "DET", "detroit": "DET", "packers": "GB", "green bay": "GB",
+    "texans": "HOU", "houston": "HOU", "colts": "IND", "indianapolis": "IND", "jaguars": "JAX", "jags": "JAX",
+    "jacksonville": "JAX", "chiefs": "KC", "kansas city": "KC", "raiders": "LV", "las vegas": "LV",
+    "chargers": "LAC", "rams": "LA", "dolphins": "MIA", "miami": "MIA", "vikings": "MIN", "minnesota": "MIN",
+    "patriots": "NE", "pats": "NE", "new england": "NE", "saints": "NO", "new orleans": "NO", "giants": "NYG",
+    "jets": "NYJ", "eagles": "PHI", "philadelphia": "PHI", "steelers": "PIT", "pittsburgh": "PIT",
+    "49ers": "SF", "niners": "SF", "san francisco": "SF", "seahawks": "SEA", "hawks": "SEA", "seattle": "SEA",
+    "buccaneers": "TB", "bucs": "TB", "tampa bay": "TB", "titans": "TEN", "tennessee": "TEN",
+    "commanders": "WAS", "washington": "WAS",
+}
+TEAM_ABBREVIATIONS = frozenset(TEAM_NAMES.values())
+# Longest names first so "new england" wins over any shorter overlap; whole words only ("bears" not "forebears")
+TEAM_NAME_PATTERN = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, sorted(TEAM_NAMES, key=len, reverse=True))) + r")\b", re.IGNORECASE
+)
+
+
+# ============================================
+# PARSERS
+# ============================================
+def parse_field_position(field_position, posteam=None):
+    """Yards from the offense's own goal line (0-100) from strings like 'SEA 44', 'OWN 41', 'MID 50'"""
+    parts = field_position.astype(str).str.extract(r"^\s*([A-Za-z]*)\s*(\d+)")
+    side = parts[0].str.upper()
+    yard = pd.to_numeric(parts[1], errors="coerce")
+    if posteam is None:
+        own = side == "OWN"
+    else:
+        own = (side == "OWN") | (side == posteam.astype(str).str.upper())
+    return pd.Series(np.where(own | (yard == 50), yard, 100 - yard), index=field_position.index)
+
+
+def parse_game_seconds(quarter, clock):
+    """Elapsed game seconds from quarter and a 'MM:SS' clock"""
+    parts = clock.astype(str).str.extract(r"(\d+):(\d+)")
+    remaining = pd.to_numeric(parts[0], errors="coerce") * 60 + pd.to_numeric(parts[1], errors="coerce")
+    return (quarter.astype(float) - 1) * QUARTER_SECONDS + (QUARTER_SECONDS - remaining)
+
+
+def find_teams(text):
+    """Abbreviations of the teams named in free text; abbreviations themselves only count in capitals ("NO", "WAS")"""
+    text = str(text)
+    teams = {TEAM_NAMES[name.lower()] for name in TEAM_NAME_PATTERN.findall(text)}
+    teams.update(word for word in re.findall(r"\b[A-Z]{2,3}\b", text) if word in TEAM_ABBREVIATIONS)
+    return teams
+
+
+def format_field_position(yardline_own, own_team, opp_team):
+    """'NE 41' / 'SEA 44' / '50' from yards past the offense's own goal line"""
+    yardline_own = int(round(yardline_own))
+    if yardline_own == 50:
+        return "50"
+    if yardline_own < 50:
+        return f"{own_team} {yardline_own}"
+    return f"{opp_team} {100 - yardline_own}"
+
+
+# ============================================
+# NORMALIZATION
+# ============================================
+def _narrow(series, dtype):
+    if dtype == "category" or dtype.startswith("float"):
+        return series.astype(dtype)
+    if series.isna().any():
+        return series.astype(dtype.capitalize())
+    return series.astype(dtype)
+
+
+def normalize_fourth_downs(df):
+    """Add YARDLINE_OWN and GAME_SECONDS, and cast every known column to its narrow dtype"""
+    df = df.copy()
+    if "FIELD_POSITION" in df.columns:
+        df["YARDLINE_OWN"] = parse_field_position(df["FIELD_POSITION"], df.get("POSTEAM"))
+    if "QUARTER" in df.columns and "TIME" in df.columns:
+        df["GAME_SECONDS"] = parse_game_seconds(df["QUARTER"], df["TIME"])
+    for col, dtype in COLUMN_DTYPES.items():
+        if col in df.columns:
+            df[col] = _narrow(df[col], dtype)
+    return df
+
+
+def concat_plays(frames):
+    """Concatenate normalized batches; categories differ per batch, so category columns are rebuilt once"""
+    df = pd.concat(frames, ignore_index=True)
+    for col, dtype in COLUMN_DTYPES.items():
+        if dtype == "category" and col in df.columns and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+    return df
+
+
+def frame_memory(df):
+    """Deep memory usage of a frame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,394 @@
+"""
+Shared Cache Tier
+=================
+Cross-process cache for replicas behind a load balancer: graded frames as Arrow IPC
+(memory-mapped on read from disk) and AI answers, under namespace-versioned keys.
+
+    python shared_cache.py bump graded      # invalidate every replica's graded frames
+    python shared_cache.py sweep            # delete expired entries from the disk store
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads of this process
+    fcntl = None
+
+DEFAULT_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "shared")
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+# Disk entries start with magic + expiry (0 = never) so payloads can be mapped past it
+HEADER = struct.Struct("<4sxxxxd")
+MAGIC = b"NPC1"
+META_KEY = b"nopunt"
+SWEEP_EVERY = 256
+
+
+class LockTimeout(Exception):
+    """Another process held the lock for longer than the timeout"""
+
+
+@contextmanager
+def file_lock(path, timeout=60):
+    """Exclusive flock on `path` across processes; only a placeholder where fcntl is missing"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise LockTimeout(path)
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ============================================
+# STORES (a small Redis-like interface: get / set / delete / incr / lock)
+# ============================================
+class MemoryStore:
+    """In-process stand-in with Redis semantics; for tests and single-process runs"""
+
+    def __init__(self):
+        self._data = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        with self._guard:
+            value, expires = self._data.get(key, (None, 0))
+            if value is not None and expires and expires < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._guard:
+            self._data[key] = (bytes(value), time.time() + ttl if ttl else 0)
+
+    def delete(self, key):
+        with self._guard:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._guard:
+            value = int(self._data.get(key, (b"0", 0))[0]) + 1
+            self._data[key] = (str(value).encode(), 0)
+            return value
+
+    @contextmanager
+    def lock(self, name, timeout=60):
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        if not lock.acquire(timeout=timeout):
+            raise LockTimeout(name)
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+class DiskStore:
+    """One file per key under a directory every replica on the host can reach; flock guards writers"""
+
+    def __init__(self, root=DEFAULT_SHARED_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "locks"), exist_ok=True)
+        self._thread_locks = {}
+        self._guard = threading.Lock()
+        self._writes = 0
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], digest[2:34])
+
+    def _read_header(self, f):
+        magic, expires = HEADER.unpack(f.read(HEADER.size))
+        return magic == MAGIC and not (expires and expires < time.time())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read() if self._read_header(f) else None
+        except (FileNotFoundError, struct.error):
+            return None
+
+    def open_mapped(self, key):
+        """Memory map of the payload, positioned after the header, or None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                if not self._read_header(f):
+                    return None
+            source = pa.memory_map(path)
+        except (FileNotFoundError, struct.error):
+            return None
+        source.seek(HEADER.size)
+        return source
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers see the old file or the new one, never half of one; open maps keep the old inode
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, time.time() + ttl if ttl else 0))
+            f.write(value)
+        os.replace(tmp, path)
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self.sweep()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def incr(self, key):
+        with self.lock(f"incr:{key}"):
+            value = int(self.get(key) or 0) + 1
+            self.set(key, str(value).encode())
+        return value
+
+    @contextmanager
+    def lock(self, name, timeout=60):
+        """Exclusive across threads (threading.Lock) and processes (flock on a lock file)"""
+        with self._guard:
+            thread_lock = self._thread_locks.setdefault(name, threading.Lock())
+        if not thread_lock.acquire(timeout=timeout):
+            raise LockTimeout(name)
+        try:
+            path = os.path.join(self.root, "locks", hashlib.sha256(name.encode()).hexdigest()[:32])
+            with file_lock(path, timeout):
+                yield
+        finally:
+            thread_lock.release()
+
+    def sweep(self):
+        """Delete expired entries and stray temp files; returns how many were removed"""
+        removed = 0
+        now = time.time()
+        for folder in os.listdir(self.root):
+            if folder == "locks" or not os.path.isdir(os.path.join(self.root, folder)):
+                continue
+            for name in os.listdir(os.path.join(self.root, folder)):
+                path = os.path.join(self.root, folder, name)
+                try:
+                    if name.endswith(".tmp"):
+                        stale = now - os.path.getmtime(path) > 3600
+                    else:
+                        with open(path, "rb") as f:
+                            stale = not self._read_header(f)
+                    if stale:
+                        os.remove(path)
+                        removed += 1
+                except (FileNotFoundError, struct.error):
+                    pass
+        return removed
+
+
+class RedisStore:
+    """Adapter over a redis-py client (or anything with the same get / set / delete / incr / lock)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return int(self.client.incr(key))
+
+    @contextmanager
+    def lock(self, name, timeout=60):
+        lock = self.client.lock(f"lock:{name}", timeout=timeout, blocking_timeout=timeout)
+        if not lock.acquire():
+            raise LockTimeout(name)
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+# ============================================
+# SHARED CACHE
+# ============================================
+def frame_to_ipc(df, meta=None):
+    """Arrow IPC stream bytes; meta rides along in the schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if meta is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: json.dumps(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def frame_from_ipc(source):
+    """(DataFrame, meta) from IPC bytes or a memory-mapped file.
+
+    Numeric columns are read-only views of the Arrow buffers (no copy; .copy() before writing in place).
+    A mapped file's handle is closed here; the mapping itself lives as long as those views.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        table = pa.ipc.open_stream(pa.py_buffer(source)).read_all()
+    else:
+        with source:
+            table = pa.ipc.open_stream(source).read_all()
+    meta = json.loads((table.schema.metadata or {}).get(META_KEY, b"{}"))
+    return table.to_pandas(split_blocks=True), meta
+
+
+class SharedCache:
+    """Frames and answers in a shared store; every key carries its namespace's current version"""
+
+    def __init__(self, store, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------------
+    # Versions
+    # --------------------------------------------
+    def version(self, namespace):
+        return int(self.store.get(f"version:{namespace}") or 0)
+
+    def bump(self, namespace):
+        """Invalidate everything in a namespace; old entries age out by TTL"""
+        return self.store.incr(f"version:{namespace}")
+
+    def _key(self, namespace, key):
+        return f"{namespace}:v{self.version(namespace)}:{key}"
+
+    # --------------------------------------------
+    # Frames
+    # --------------------------------------------
+    def _lookup(self, namespace, key):
+        """(DataFrame, meta) or None, without touching the hit / miss counters"""
+        full_key = self._key(namespace, key)
+        open_mapped = getattr(self.store, "open_mapped", None)
+        source = open_mapped(full_key) if open_mapped else self.store.get(full_key)
+        return frame_from_ipc(source) if source is not None else None
+
+    def get_frame(self, namespace, key):
+        """(DataFrame, meta) or None; disk stores are memory-mapped instead of read"""
+        cached = self._lookup(namespace, key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def put_frame(self, namespace, key, df, meta=None):
+        self.store.set(self._key(namespace, key), frame_to_ipc(df, meta).to_pybytes(), ttl=self.ttl_seconds)
+
+    def frame(self, namespace, key, compute):
+        """Cached (DataFrame, meta), or compute() -> (DataFrame, meta) once across every replica"""
+        cached = self.get_frame(namespace, key)
+        if cached is not None:
+            return cached
+        try:
+            with self.store.lock(f"{namespace}:{key}"):
+                # Another replica may have finished while this one waited for the lock; the miss is already counted
+                cached = self._lookup(namespace, key)
+                if cached is not None:
+                    return cached
+                df, meta = compute()
+                self.put_frame(namespace, key, df, meta)
+                return df, meta
+        except LockTimeout:
+            # The replica holding the lock is stuck or slow; computing here beats failing the page
+            df, meta = compute()
+            self.put_frame(namespace, key, df, meta)
+            return df, meta
+
+    # --------------------------------------------
+    # Answers (keys already include the data fingerprint and model)
+    # --------------------------------------------
+    def get_answer(self, key):
+        value = self.store.get(self._key("answers", key))
+        return value.decode() if value is not None else None
+
+    def put_answer(self, key, answer):
+        self.store.set(self._key("answers", key), answer.encode(), ttl=self.ttl_seconds)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "backend": type(self.store).__name__}
+
+
+# ============================================
+# CONFIGURATION
+# ============================================
+def shared_cache_from_config(config):
+    """Shared tier for a [shared_cache] config section (default: disk store under .cache/shared)"""
+    if not config.get("enabled", True):
+        return None
+    backend = config.get("backend", "disk")
+    if backend == "redis":
+        store = RedisStore.from_url(config["url"])
+    elif backend == "memory":
+        store = MemoryStore()
+    else:
+        store = DiskStore(config.get("path", DEFAULT_SHARED_DIR))
+    return SharedCache(store, ttl_seconds=config.get("ttl_seconds", DEFAULT_TTL_SECONDS))
+
+
+def main():
+    import tomllib
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["bump", "sweep"])
+    parser.add_argument("namespace", nargs="?", default="graded")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.secrets):
+        with open(args.secrets, "rb") as f:
+            config = tomllib.load(f).get("shared_cache", {})
+    cache = shared_cache_from_config(config)
+    if cache is None:
+        print("Shared cache is disabled")
+    elif args.command == "bump":
+        print(f"{args.namespace} is now at version {cache.bump(args.namespace)}")
+    elif isinstance(cache.store, DiskStore):
+        print(f"Removed {cache.store.sweep()} expired entries")
+    else:
+        print("Only the disk store needs sweeping; Redis expires keys itself")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Monte Carlo Game Simulator
+==========================
+Plays out the rest of the game from a 4th down under each decision
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from decision_model import MAX_FG_DISTANCE, load_tables
+
+# P(touchdown) / P(field goal) for a drive by yards to the opponent's goal at its start
+DRIVE_TD_RATE = {1: 0.80, 10: 0.62, 20: 0.52, 40: 0.38, 60: 0.28, 75: 0.21, 90: 0.14, 99: 0.10}
+DRIVE_FG_RATE = {1: 0.15, 10: 0.28, 20: 0.33, 40: 0.28, 60: 0.18, 75: 0.13, 90: 0.08, 99: 0.05}
+
+DRIVE_SECONDS_MEAN = 160
+DRIVE_SECONDS_SD = 50
+KICKOFF_TO_GOAL = 75
+# Where the next drive starts after a punt/turnover, in yards to the opponent's goal
+CHANGE_OF_POSSESSION_MEAN = 70
+CHANGE_OF_POSSESSION_SD = 10
+PUNT_NET_SD = 8
+MAX_POSSESSIONS = 40
+
+# Simulations per worker task; larger runs are fanned out over processes
+CHUNK_SIZE = 25_000
+
+
+def _rate_table(breakpoints):
+    xs = sorted(breakpoints)
+    return np.interp(np.arange(101), xs, [breakpoints[x] for x in xs])
+
+
+TD_TABLE = _rate_table(DRIVE_TD_RATE)
+FG_TABLE = _rate_table(DRIVE_FG_RATE)
+
+
+def _at(table, to_goal):
+    return table[np.clip(to_goal.astype(int), 0, len(table) - 1)]
+
+
+# ============================================
+# VECTORIZED CORE
+# ============================================
+def _simulate_chunk(args):
+    """Simulate `n` games from one state; returns final margins for the team facing 4th down"""
+    decision, yardline_own, ydstogo, margin, seconds_remaining, n, seed = args
+    rng = np.random.default_rng(seed)
+    tables = load_tables()
+    to_goal = np.full(n, 100.0 - yardline_own)
+    margin = np.full(n, float(margin))
+    clock = np.full(n, float(seconds_remaining))
+    # +1 when the 4th-down team has the ball next, -1 when the opponent does
+    offense = np.ones(n)
+
+    # Resolve the 4th down itself
+    if decision == "go":
+        conv = tables["conversion"][min(max(int(ydstogo), 0), 99)]
+        made = rng.random(n) < conv
+        to_goal = np.where(made, np.maximum(to_goal - ydstogo, 1), 100 - to_goal)
+        offense = np.where(made, 1.0, -1.0)
+    elif decision == "punt":
+        net = tables["punt_net"][int(np.clip(to_goal[0], 0, 100))] + rng.normal(0, PUNT_NET_SD, n)
+        landing = to_goal - net
+        to_goal = np.where(landing < 20, 80, 100 - landing)
+        offense = -offense
+    elif decision == "fg":
+        distance = to_goal + 17
+        # Same make-rate table as the decision model, so the two agree under a table override
+        make_rate = _at(tables["fg_make"], distance)
+        made = (rng.random(n) < make_rate) & (distance <= MAX_FG_DISTANCE)
+        margin = margin + np.where(made, 3, 0)
+        to_goal = np.where(made, KICKOFF_TO_GOAL, np.minimum(100 - (to_goal + 7), 80))
+        offense = -offense
+    else:
+        raise ValueError(f"Unknown decision {decision!r}")
+    clock -= 6
+
+    # Alternate possessions until time runs out
+    for _ in range(MAX_POSSESSIONS):
+        live = clock > 0
+        if not live.any():
+            break
+        roll = rng.random(n)
+        td_rate = _at(TD_TABLE, to_goal)
+        fg_rate = _at(FG_TABLE, to_goal)
+        points = np.select([roll < td_rate, roll < td_rate + fg_rate], [7, 3], default=0)
+        drive_time = np.clip(rng.normal(DRIVE_SECONDS_MEAN, DRIVE_SECONDS_SD, n), 30, 400)
+        # A drive cut off by the clock only scores if it would have finished in time
+        points = np.where(live & (drive_time <= clock + 30), points, 0)
+        margin += offense * points
+        clock = np.where(live, clock - drive_time, clock)
+        next_start = np.clip(rng.normal(CHANGE_OF_POSSESSION_MEAN, CHANGE_OF_POSSESSION_SD, n), 20, 99)
+        to_goal = np.where(points > 0, KICKOFF_TO_GOAL, next_start)
+        offense = np.where(live, -offense, offense)
+    return margin
+
+
+# ============================================
+# PUBLIC API
+# ============================================
+def simulate_decision(decision, yardline_own, ydstogo, margin, seconds_remaining,
+                      n_sims=100_000, seed=0, executor=None):
+    """Final-margin samples for one decision; chunks run on `executor` when given"""
+    n_chunks = max(1, -(-n_sims // CHUNK_SIZE))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [CHUNK_SIZE] * (n_chunks - 1) + [n_sims - CHUNK_SIZE * (n_chunks - 1)]
+    tasks = [(decision, yardline_own, ydstogo, margin, seconds_remaining, size, s)
+             for size, s in zip(sizes, seeds)]
+    if executor is None or n_chunks == 1:
+        results = map(_simulate_chunk, tasks)
+    else:
+        results = executor.map(_simulate_chunk, tasks)
+    return np.concatenate(list(results))
+
+
+def summarize(margins):
+    """Win probability (ties count half) with a 95% confidence interval and margin quantiles"""
+    wins = (margins > 0) + 0.5 * (margins == 0)
+    wp = wins.mean()
+    half_width = 1.96 * wins.std(ddof=1) / np.sqrt(len(wins)) if len(wins) > 1 else 0.0
+    q10, q50, q90 = np.percentile(margins, [10, 50, 90])
+    return {
+        "wp": float(wp * 100),
+        "ci_low": float(max(wp - half_width, 0) * 100),
+        "ci_high": float(min(wp + half_width, 1) * 100),
+        "margin_p10": float(q10),
+        "margin_p50": float(q50),
+        "margin_p90": float(q90),
+        "n_sims": len(margins),
+    }
+
+
+def simulate_fourth_down(yardline_own, ydstogo, margin, seconds_remaining,
+                         n_sims=100_000, seed=0, executor=None):
+    """Summaries for every legal decision from one 4th down state"""
+    decisions = ["go", "punt"]
+    if (100 - yardline_own) + 17 <= MAX_FG_DISTANCE:
+        decisions.append("fg")
+    return {
+        decision: summarize(simulate_decision(decision, yardline_own, ydstogo, margin,
+                                              seconds_remaining, n_sims, seed, executor))
+        for decision in decisions
+    }
+
+
+def make_executor(max_workers=None):
+    """Process pool for fanning out simulation chunks"""
+    return ProcessPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1))
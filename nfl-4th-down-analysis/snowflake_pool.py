@@ -0,0 +1,276 @@
+"""
+Snowflake Connection Pool
+=========================
+Bounded, thread-safe pool with health checks and transparent reconnect
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+
+# ============================================
+# ROUND-TRIP INSTRUMENTATION
+# ============================================
+_current_trips = contextvars.ContextVar("snowflake_round_trips", default=None)
+
+
+class RoundTrips:
+    """Statements sent to Snowflake while a tracker is active"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def add(self, label):
+        self.statements.append(" ".join(str(label).split())[:80])
+
+
+@contextmanager
+def track_round_trips():
+    """Count every Snowflake round trip made in this context"""
+    trips = RoundTrips()
+    token = _current_trips.set(trips)
+    try:
+        yield trips
+    finally:
+        _current_trips.reset(token)
+
+
+def record_round_trip(label):
+    trips = _current_trips.get()
+    if trips is not None:
+        trips.add(label)
+
+
+class _CountingConnection:
+    """Proxy that records each connect and cursor.execute as a round trip"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _CountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, *args, **kwargs):
+        record_round_trip(sql)
+        return self._cursor.execute(sql, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionPool:
+    """Hands out at most max_size connections; idle ones are reused LIFO"""
+
+    def __init__(self, connect, max_size=4, init_sql=(), health_check_sql="SELECT 1",
+                 health_check_after=60, checkout_timeout=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.init_sql = list(init_sql)
+        self.health_check_sql = health_check_sql
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reconnects = 0
+
+    # --------------------------------------------
+    # Connection lifecycle
+    # --------------------------------------------
+    def _open(self):
+        record_round_trip("connect")
+        conn = _CountingConnection(self._connect())
+        if self.init_sql:
+            cursor = conn.cursor()
+            try:
+                for sql in self.init_sql:
+                    cursor.execute(sql)
+            finally:
+                cursor.close()
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            if getattr(conn, "is_closed", lambda: False)():
+                return False
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.health_check_sql)
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # --------------------------------------------
+    # Checkout / checkin
+    # --------------------------------------------
+    def checkout(self, timeout=None):
+        """Borrow a healthy connection, opening or replacing one as needed"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f"No Snowflake connection free after {timeout}s")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if time.monotonic() - last_used < self.health_check_after or self._is_healthy(conn):
+                    return conn
+                self._close(conn)
+                with self._lock:
+                    self._reconnects += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, conn, broken=False):
+        """Return a connection; broken ones are closed instead of reused"""
+        try:
+            if broken or getattr(conn, "is_closed", lambda: False)():
+                self._close(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Checkout for the duration of a with-block; errors mark it broken if unhealthy"""
+        conn = self.checkout()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = not self._is_healthy(conn)
+            raise
+        finally:
+            self.checkin(conn, broken=broken)
+
+    def run(self, fn, retries=1):
+        """Call fn(conn); if the connection died, retry once on a fresh one"""
+        for attempt in range(retries + 1):
+            conn = self.checkout()
+            try:
+                result = fn(conn)
+            except Exception:
+                broken = not self._is_healthy(conn)
+                self.checkin(conn, broken=broken)
+                if not broken or attempt == retries:
+                    raise
+                with self._lock:
+                    self._reconnects += 1
+                continue
+            self.checkin(conn)
+            return result
+
+    def health_check(self):
+        """Probe one connection; True if the backend answers"""
+        try:
+            with self.connection() as conn:
+                return self._is_healthy(conn)
+        except Exception:
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "idle": self._idle.qsize(),
+                "created": self._created,
+                "reconnects": self._reconnects,
+            }
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+# ============================================
+# CONFIGURATION
+# ============================================
+def connect_params(sf_config):
+    """snowflake.connector.connect kwargs from a [snowflake] config section (password or key-pair auth)"""
+    # Role, warehouse and session parameters are applied at login so no USE statements are needed per query
+    conn_params = {
+        "account": sf_config["account"],
+        "user": sf_config["user"],
+        "role": sf_config.get("role", "SYSADMIN"),
+        "warehouse": sf_config["warehouse"],
+        "database": sf_config["database"],
+        "schema": sf_config["schema"],
+        # Server-side binding with ? placeholders
+        "paramstyle": "qmark",
+        "session_parameters": {
+            "QUERY_TAG": "nopunt-4th-down-app",
+            **sf_config.get("session_parameters", {}),
+        },
+    }
+
+    # Key-pair authentication is preferred; passwords may not work with MFA
+    if "private_key" in sf_config:
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import serialization
+
+        p_key = serialization.load_pem_private_key(
+            sf_config["private_key"].encode(),
+            password=None,
+            backend=default_backend()
+        )
+        conn_params["private_key"] = p_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+    elif "password" in sf_config:
+        conn_params["password"] = sf_config["password"]
+    else:
+        raise ValueError("No authentication method found in secrets (need 'password' or 'private_key')")
+    return conn_params
+
+
+def pool_from_config(sf_config, conn_params=None):
+    """ConnectionPool over snowflake.connector sized by the [snowflake] config section"""
+    import snowflake.connector
+
+    conn_params = conn_params or connect_params(sf_config)
+    return ConnectionPool(
+        connect=lambda: snowflake.connector.connect(**conn_params),
+        max_size=int(sf_config.get("pool_size", 4)),
+        init_sql=sf_config.get("init_sql", []),
+    )
@@ -4,8 +4,36 @@ Super Bowl LX 4th Down Analysis
 Original UX with Dark Mode
 """
 
+import threading
+import time
+
+import altair as alt
 import streamlit as st
 import pandas as pd
+import numpy as np
+from streamlit.errors import StreamlitSecretNotFoundError
+
+from answer_cache import AnswerCache, data_fingerprint, make_key
+from chat_history import ChatHistory
+from coalescing import FlightInterrupted, SingleFlight, Throttle
+from context_builder import PlayIndex, distance_bucket, field_bucket, score_bucket, system_prompt as render_system_prompt
+from data_sources import query_from_config, source_from_config
+from decision_model import grade_plays
+from health import HealthMonitor
+from key_plays import KeyPlays, describe as describe_play
+from live import JsonlFeed, LiveGame
+from hedging import BackendUnavailable, HedgedClient
+from llm import complete_cortex, ping_cortex, stream_anthropic, stream_cortex
+from play_table import PlayTable, payload_bytes
+from pushdown import Pushdown, play_metrics
+from rollup import LeagueRollup, league_context, model_signature
+from shared_cache import shared_cache_from_config
+from question_index import QuestionIndex
+from schema import format_field_position, frame_memory, normalize_fourth_downs
+from simulator import make_executor, simulate_fourth_down
+from timeline import game_timeline
+from snowflake_pool import connect_params, pool_from_config, record_round_trip, track_round_trips
+from warmup import EXAMPLE_QUESTIONS, warm_questions, warm_up
 
 # ============================================
 # PAGE CONFIG
@@ -16,6 +44,8 @@ st.set_page_config(
     layout="wide"
 )
 
+run_started = time.perf_counter()
+
 # ============================================
 # THEME TOGGLE
 # ============================================
@@ -282,355 +312,719 @@ else:
     </style>
     """, unsafe_allow_html=True)
 
+# ============================================
+# SECRETS (all optional: the public app runs on the bundled sample without a secrets file)
+# ============================================
+def optional_secret(name, default=None):
+    """A top-level secrets entry, or `default` when it is unset or there is no secrets file at all"""
+    try:
+        return st.secrets.get(name, default)
+    except StreamlitSecretNotFoundError:
+        return default
+
 # ============================================
 # SNOWFLAKE CONNECTION
 # ============================================
 @st.cache_resource
-def get_snowflake_connection():
-    """Create Snowflake connection from secrets (supports password or key-pair auth)"""
+def get_snowflake_connect_params():
+    """Build Snowflake connection params from secrets (supports password or key-pair auth); None without [snowflake]"""
+    sf_config = optional_secret("snowflake")
+    if sf_config is None:
+        return None
     try:
-        import snowflake.connector
-        
-        sf_config = st.secrets["snowflake"]
-        
-        # Base connection params
-        conn_params = {
-            "account": sf_config["account"],
-            "user": sf_config["user"],
-            "warehouse": sf_config["warehouse"],
-            "database": sf_config["database"],
-            "schema": sf_config["schema"],
-        }
-        
-        # Check for key-pair auth (preferred) or password auth
-        if "private_key" in sf_config:
-            # Key-pair authentication
-            from cryptography.hazmat.backends import default_backend
-            from cryptography.hazmat.primitives import serialization
-            
-            private_key_text = sf_config["private_key"]
-            
-            # Load the private key
-            p_key = serialization.load_pem_private_key(
-                private_key_text.encode(),
-                password=None,
-                backend=default_backend()
-            )
-            
-            # Get the raw bytes for Snowflake
-            pkb = p_key.private_bytes(
-                encoding=serialization.Encoding.DER,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            )
-            
-            conn_params["private_key"] = pkb
-        elif "password" in sf_config:
-            # Password authentication (may not work with MFA)
-            conn_params["password"] = sf_config["password"]
-        else:
-            st.error("No authentication method found in secrets (need 'password' or 'private_key')")
-            return None
-        
-        conn = snowflake.connector.connect(**conn_params)
-        return conn
-        
+        return connect_params(sf_config)
     except Exception as e:
         st.error(f"Snowflake connection error: {e}")
         return None
 
+@st.cache_resource
+def get_connection_pool():
+    """Process-wide pool of Snowflake connections shared by all sessions"""
+    conn_params = get_snowflake_connect_params()
+    if conn_params is None:
+        return None
+    return pool_from_config(optional_secret("snowflake"), conn_params)
+
+# ============================================
+# DATA SOURCE
 # ============================================
-# SAMPLE DATA
-# ============================================
-def get_fourth_down_data():
-    """Patriots 4th down data from Super Bowl LX"""
-    return pd.DataFrame([
-        {"QUARTER": 1, "TIME": "10:23", "YARDS_TO_GO": 8, "FIELD_POSITION": "SEA 44", 
-         "NE_SCORE": 0, "SEA_SCORE": 3, "SCORE_DIFFERENTIAL": -3, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 38.0, "WPA_PCT": -3.0, "EPA": -0.5, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt to SEA 20"},
-        {"QUARTER": 1, "TIME": "5:45", "YARDS_TO_GO": 15, "FIELD_POSITION": "NE 35",
-         "NE_SCORE": 0, "SEA_SCORE": 3, "SCORE_DIFFERENTIAL": -3, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 35.0, "WPA_PCT": -2.0, "EPA": -0.3, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt downed at SEA 15"},
-        {"QUARTER": 2, "TIME": "9:30", "YARDS_TO_GO": 17, "FIELD_POSITION": "NE 28",
-         "NE_SCORE": 0, "SEA_SCORE": 6, "SCORE_DIFFERENTIAL": -6, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 25.0, "WPA_PCT": -3.0, "EPA": -0.4, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt to SEA 25"},
-        {"QUARTER": 2, "TIME": "2:15", "YARDS_TO_GO": 6, "FIELD_POSITION": "SEA 38",
-         "NE_SCORE": 0, "SEA_SCORE": 6, "SCORE_DIFFERENTIAL": -6, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 22.0, "WPA_PCT": -2.5, "EPA": -0.6, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt into end zone, touchback"},
-        {"QUARTER": 3, "TIME": "8:40", "YARDS_TO_GO": 1, "FIELD_POSITION": "OWN 41",
-         "NE_SCORE": 0, "SEA_SCORE": 12, "SCORE_DIFFERENTIAL": -12, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 12.0, "WPA_PCT": -4.2, "EPA": -0.8, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "4th & 1 PUNT from own 41 - THE KEY PLAY"},
-        {"QUARTER": 3, "TIME": "2:30", "YARDS_TO_GO": 8, "FIELD_POSITION": "NE 23",
-         "NE_SCORE": 0, "SEA_SCORE": 12, "SCORE_DIFFERENTIAL": -12, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 8.0, "WPA_PCT": -2.0, "EPA": -0.3, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt to SEA 45"},
-        {"QUARTER": 4, "TIME": "12:05", "YARDS_TO_GO": 11, "FIELD_POSITION": "NE 19",
-         "NE_SCORE": 6, "SEA_SCORE": 19, "SCORE_DIFFERENTIAL": -13, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 5.0, "WPA_PCT": -1.5, "EPA": -0.2, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt to SEA 35"},
-        {"QUARTER": 4, "TIME": "5:20", "YARDS_TO_GO": 4, "FIELD_POSITION": "SEA 48",
-         "NE_SCORE": 13, "SEA_SCORE": 22, "SCORE_DIFFERENTIAL": -9, "PLAY_TYPE": "punt",
-         "WIN_PROB_PCT": 6.0, "WPA_PCT": -3.0, "EPA": -0.7, "PUNT_ATTEMPT": 1,
-         "PLAY_DESCRIPTION": "Punt with 5 min left, down 9"},
-    ])
+def get_data_source():
+    """Pick the play-by-play backend from the [data] secrets section (default: bundled sample)"""
+    data_config = optional_secret("data", {})
+    pool = get_connection_pool() if data_config.get("source") == "snowflake" else None
+    return source_from_config(data_config, pool)
+
+@st.cache_data(show_spinner="Loading plays...")
+def load_fourth_downs(source_key, seasons=(), game_ids=(), posteams=()):
+    """4th down plays for a query; cached per (source, filters) across reruns and sessions"""
+    plays = get_data_source().load(seasons=seasons, game_ids=game_ids, posteams=posteams)
+    return normalize_fourth_downs(plays)
 
 # ============================================
-# AI CHAT FUNCTION - SNOWFLAKE CORTEX
+# VIEW MODELS (derived once per dataset, shared by every rerun)
 # ============================================
-def get_ai_response(question, fourth_downs_df):
-    """Get AI response using Snowflake Cortex via SQL"""
-    
-    # Build context from data
-    data_context = fourth_downs_df.to_string()
+def get_pushdown():
+    """Warehouse grading when [data] pushdown = true on a Snowflake source, else None"""
+    data_config = optional_secret("data", {})
+    if data_config.get("pushdown") and data_config.get("source") == "snowflake":
+        return Pushdown(get_data_source())
+    return None
+
+@st.cache_resource
+def get_shared_cache():
+    """Cache tier shared by every replica ([shared_cache]; default: disk store under .cache/shared)"""
+    return shared_cache_from_config(optional_secret("shared_cache", {}))
+
+@st.cache_resource(show_spinner="Loading plays...", max_entries=8)
+def load_graded_plays(source_key, seasons=(), game_ids=(), posteams=()):
+    """Plays with model WP for go / punt / FG and a grade by WP given up, plus their fingerprint.
+
+    A resource, not data: st.cache_data would pickle a copy of the memory-mapped frame on every rerun.
+    Every session shares this frame, so treat it as read-only.
+    """
+    def compute():
+        pushdown = get_pushdown()
+        if pushdown is not None:
+            plays = pushdown.load(seasons, game_ids, posteams)
+        else:
+            plays = grade_plays(load_fourth_downs(source_key, seasons, game_ids, posteams))
+        return plays, {"fingerprint": data_fingerprint(plays)}
     
-    system_prompt = f"""You are an NFL analytics expert analyzing the Patriots' 4th down decisions in Super Bowl LX (Seahawks 29, Patriots 13).
+    shared = get_shared_cache()
+    if shared is None:
+        plays, meta = compute()
+    else:
+        # One replica loads and grades; the rest map its Arrow frame. Regrading rules change the key.
+        key = f"{source_key}|{seasons}|{game_ids}|{posteams}|{model_signature()}"
+        plays, meta = shared.frame("graded", key, compute)
+    return plays, meta["fingerprint"]
 
-Here is the data on all Patriots 4th down plays:
-{data_context}
+def graded_source_key():
+    pushdown = get_pushdown()
+    return pushdown.cache_key if pushdown is not None else get_data_source().cache_key
 
-Key facts:
-- NFL 4th & 1 conversion rate is 72%
-- The Patriots punted on 4th & 1 from their own 41 while down 12-0 in Q3
-- WPA = Win Probability Added (negative means the decision hurt their chances)
-- EPA = Expected Points Added
+def get_graded_plays():
+    """Graded 4th downs selected by the [data] secrets section, or the live game so far"""
+    if get_live_game() is not None:
+        return current_plays()
+    return load_graded_plays(graded_source_key(), **query_from_config(optional_secret("data", {})))
 
-Answer questions concisely and reference specific plays from the data."""
+@st.cache_data(show_spinner=False)
+def warehouse_metrics(source_key, seasons=(), game_ids=(), posteams=()):
+    """Header metrics aggregated by the warehouse, cached per (source, filters)"""
+    return get_pushdown().metrics(seasons, game_ids, posteams)
 
-    # Combine system prompt and user question
-    full_prompt = f"{system_prompt}\n\nUser question: {question}"
-    
-    # Try Snowflake Cortex first
+# ============================================
+# LIVE GAME ([live] feed = "plays.jsonl"; timed fragments below pick up new plays)
+# ============================================
+LIVE_REFRESH_SECONDS = optional_secret("live", {}).get("refresh_seconds", 5) if optional_secret("live", {}).get("feed") else None
+live_fragment = st.fragment(run_every=LIVE_REFRESH_SECONDS)
+
+@st.cache_resource
+def get_live_game():
+    """Process-wide tail of the [live] feed, or None outside live mode"""
+    feed = optional_secret("live", {}).get("feed")
+    return LiveGame(JsonlFeed(feed)) if feed else None
+
+def current_plays(plays=None, fingerprint=None):
+    """The live frame after grading any new plays, else the (plays, fingerprint) given"""
+    game = get_live_game()
+    if game is None:
+        return plays, fingerprint
+    game.refresh()
+    return game.snapshot()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def header_metrics(fingerprint, _plays):
+    if get_pushdown() is not None:
+        return warehouse_metrics(graded_source_key(), **query_from_config(optional_secret("data", {})))
+    return play_metrics(_plays)
+
+@st.cache_resource(max_entries=8)
+def get_play_table(fingerprint, _plays):
+    """Filter codes and sort orders for the data tab, built once per dataset"""
+    return PlayTable(_plays)
+
+ROLLUP_REFRESH_SECONDS = 3600
+
+@st.cache_resource(ttl=ROLLUP_REFRESH_SECONDS, show_spinner="Building league rollups...")
+def get_league_rollup():
+    """League cube for [rollup] (same keys as [data]); the latest season is rechecked hourly. None without [rollup]"""
+    # Rolling up the dashboard's own plays would compare the team with itself, so a separate source is required
+    config = optional_secret("rollup", {})
+    if not config or not config.get("enabled", True):
+        return None
+    pool = get_connection_pool() if config.get("source") == "snowflake" else None
+    source = source_from_config(config, pool)
+    query = query_from_config(config)
     try:
-        conn = get_snowflake_connection()
-        if conn:
-            cursor = conn.cursor()
-            
-            # Set role and warehouse
-            cursor.execute("USE ROLE SYSADMIN")
-            cursor.execute(f"USE WAREHOUSE {st.secrets['snowflake']['warehouse']}")
-            
-            # Escape single quotes in the prompt for SQL
-            escaped_prompt = full_prompt.replace("'", "''")
-            
-            # Call Cortex COMPLETE function
-            sql = f"""
-            SELECT SNOWFLAKE.CORTEX.COMPLETE(
-                'mistral-large',
-                '{escaped_prompt}'
-            ) as response
-            """
-            
-            cursor.execute(sql)
-            result = cursor.fetchone()
-            cursor.close()
-            
-            if result and result[0]:
-                return result[0]
-            else:
-                return "No response from Cortex"
-                
+        rollup = LeagueRollup.for_source(source.cache_key, query)
+        rollup.refresh_source(source, **query)
     except Exception as e:
-        error_msg = str(e)
-        
-        # If Cortex fails, try Anthropic as fallback
-        if "ANTHROPIC_API_KEY" in st.secrets:
-            try:
-                import anthropic
-                client = anthropic.Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
-                message = client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=500,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": question}]
-                )
-                return message.content[0].text
-            except Exception as anthropic_error:
-                return f"Cortex error: {error_msg[:100]}\n\nAnthropic fallback error: {str(anthropic_error)[:100]}"
-        
-        return f"Cortex error: {error_msg[:200]}"
+        st.warning(f"League rollups unavailable: {str(e)[:200]}")
+        return None
+    return rollup
+
+@st.cache_resource(max_entries=8)
+def get_key_plays(fingerprint, _plays):
+    """Costliest 4th downs per game, ranked once per dataset"""
+    return KeyPlays(_plays)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def analysis_view(fingerprint, _plays):
+    games = _plays.groupby('GAME_ID', observed=True, sort=False)
+    teams = {
+        str(game_id): sorted(set(game['POSTEAM'].astype(str)) | set(game['DEFTEAM'].astype(str)))
+        for game_id, game in games
+    }
+    return {"grade_counts": _plays['GRADE'].value_counts().to_dict(), "teams": teams}
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def plays_memory(fingerprint, _plays):
+    """Deep size of the typed frame in bytes, measured once per dataset"""
+    return frame_memory(_plays)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def wp_timeline(fingerprint, game_id, team, _plays):
+    """Downsampled WP line and 4th-down markers, cached per (dataset, game, team)"""
+    return game_timeline(_plays[_plays['GAME_ID'].astype(str) == game_id], team)
+
+def timeline_chart(line, markers):
+    base = alt.Chart(line).mark_line().encode(
+        x=alt.X('GAME_SECONDS:Q', title='Game time', scale=alt.Scale(domain=[0, 3600]),
+                axis=alt.Axis(values=[0, 900, 1800, 2700], labelExpr="'Q' + (datum.value / 900 + 1)")),
+        y=alt.Y('WP:Q', title='Win probability (%)', scale=alt.Scale(domain=[0, 100])),
+    )
+    points = alt.Chart(markers).mark_point(filled=True, size=90).encode(
+        x='GAME_SECONDS:Q',
+        y='WP:Q',
+        color=alt.Color('DECISION:N', title='4th down'),
+        shape=alt.Shape('DECISION:N'),
+        tooltip=['SITUATION', 'DECISION', 'GRADE', alt.Tooltip('WP:Q', format='.1f')],
+    )
+    return base + points
 
 # ============================================
-# LOAD DATA
+# MONTE CARLO SIMULATION
 # ============================================
-fourth_downs = get_fourth_down_data()
+SIM_COUNT = 100_000
 
-# Grade decisions
-def grade_decision(row):
-    ydstogo = row.get('YARDS_TO_GO', 10)
-    score_diff = row.get('SCORE_DIFFERENTIAL', 0)
-    wpa = row.get('WPA_PCT', 0)
-    punt = row.get('PUNT_ATTEMPT', 0)
-    
-    if punt == 1:
-        if ydstogo <= 1 and score_diff <= -10:
-            return "🔴 TERRIBLE"
-        elif ydstogo <= 2 and score_diff <= -7:
-            return "🔴 BAD"
-        elif ydstogo <= 4 and score_diff <= -9:
-            return "🟡 QUESTIONABLE"
-        elif wpa < -3:
-            return "🟡 QUESTIONABLE"
-    return "✅ OK"
+@st.cache_resource
+def get_sim_executor():
+    """Process pool shared by all sessions for simulation chunks"""
+    return make_executor()
+
+@st.cache_data(show_spinner="Simulating...")
+def simulate_game_state(yardline_own, ydstogo, margin, seconds_remaining, n_sims=SIM_COUNT, seed=0):
+    """Seeded simulation summaries per decision, cached per game state"""
+    return simulate_fourth_down(
+        int(yardline_own), int(ydstogo), int(margin), float(seconds_remaining),
+        n_sims=n_sims, seed=seed, executor=get_sim_executor(),
+    )
 
-fourth_downs['GRADE'] = fourth_downs.apply(grade_decision, axis=1)
+def simulate_play(play):
+    return simulate_game_state(
+        int(play['YARDLINE_OWN']), int(play['YARDS_TO_GO']),
+        int(play['SCORE_DIFFERENTIAL']), 3600 - int(play['GAME_SECONDS']),
+    )
 
 # ============================================
-# HEADER WITH DARK MODE TOGGLE
+# ANSWER CACHE
 # ============================================
-header_col1, header_col2 = st.columns([4, 1])
+CORTEX_MODEL = "mistral-large"
+ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
 
-with header_col1:
-    st.title("🏈 Super Bowl LX: 4th Down Analysis")
-    
-with header_col2:
-    st.session_state.dark_mode = st.toggle("🌙", value=st.session_state.dark_mode, help="Dark/Light Mode")
+@st.cache_resource
+def get_llm_client():
+    """Process-wide hedging client; keeps circuit breakers and latency stats across sessions"""
+    llm_config = optional_secret("llm", {})
+    return HedgedClient(
+        hedge_after=float(llm_config.get("hedge_after", 4.0)),
+        timeouts={
+            "cortex": float(llm_config.get("cortex_timeout", 30)),
+            "anthropic": float(llm_config.get("anthropic_timeout", 30)),
+            # Not streamed: the first chunk is the whole answer
+            "cortex-sql": float(llm_config.get("cortex_sql_timeout", 60)),
+        },
+    )
 
-st.markdown("### Seahawks 29 - Patriots 13")
-st.markdown("*Why conservative play-calling cost New England the game*")
+@st.cache_resource
+def get_single_flight():
+    """Shares one backend call between sessions asking the same thing at once"""
+    return SingleFlight()
+
+@st.cache_resource
+def get_throttles():
+    """Per-backend rate and concurrency limits so spikes queue instead of erroring"""
+    llm_config = optional_secret("llm", {})
+    return {
+        name: Throttle(
+            rate=float(llm_config.get(f"{name}_rate", 5.0)),
+            burst=int(llm_config.get(f"{name}_burst", 10)),
+            max_concurrent=int(llm_config.get(f"{name}_max_concurrent", 8)),
+            queue_timeout=float(llm_config.get("queue_timeout", 30)),
+        )
+        for name in ("cortex", "anthropic")
+    }
+
+@st.cache_resource
+def get_answer_cache():
+    """Process-wide answer cache persisted to SQLite so it survives restarts; backed by the shared tier"""
+    return AnswerCache(shared=get_shared_cache())
+
+@st.cache_resource
+def get_question_index():
+    """Near-duplicate index over answered questions, persisted next to the answer cache"""
+    return QuestionIndex()
+
+def similar_answer(question, fingerprint):
+    """Stored answer for a near-duplicate of a standalone question, if one clears the [similarity] threshold"""
+    threshold = float(optional_secret("similarity", {}).get("threshold", 0.75))
+    question_index = get_question_index()
+    match = question_index.best_match(question, fingerprint, threshold)
+    if match is None:
+        return None
+    # The caller records the lookup once; an indexed question whose answer expired is not a match
+    answer = get_answer_cache().get(match[0], fingerprint, CORTEX_MODEL, ANTHROPIC_MODEL, record=False)
+    if answer is not None:
+        question_index.record_match()
+    return answer
+
+def remember_answer(question, fingerprint, model, answer, conversation=""):
+    """Cache an answer; standalone questions also become near-duplicate candidates"""
+    get_answer_cache().put(cache_question(question, conversation), fingerprint, model, answer)
+    if not conversation:
+        get_question_index().add(question, fingerprint)
+
+HEALTH_PROBE_SECONDS = 30
+
+@st.cache_resource
+def get_health_monitor():
+    """Probes Snowflake and Cortex on a background thread, once per server process"""
+    pool = get_connection_pool()
+    probes = {}
+    if pool:
+        probes["snowflake"] = pool.health_check
+        probes["cortex"] = lambda: pool.run(lambda conn: ping_cortex(conn, CORTEX_MODEL), retries=0)
+    return HealthMonitor(probes, interval=HEALTH_PROBE_SECONDS).start()
+
+def probe_age(status):
+    return f"{time.time() - status['checked_at']:.0f}s ago"
 
 # ============================================
-# HOME SCREEN: AI CHAT + KEY STATS
+# AI CHAT FUNCTION - SNOWFLAKE CORTEX
 # ============================================
+PROMPT_TOKEN_BUDGET = 1500
+PROMPT_TOP_K = 25
 
-# Top row: Key metrics
-col1, col2, col3, col4 = st.columns(4)
-
-punts = fourth_downs[fourth_downs['PUNT_ATTEMPT'] == 1]
-
-with col1:
-    st.metric("4th Down Punts", len(punts))
-with col2:
-    bad_decisions = len(fourth_downs[fourth_downs['GRADE'].str.contains('🔴|🟡')])
-    st.metric("Bad/Questionable", bad_decisions)
-with col3:
-    total_wpa = punts['WPA_PCT'].sum()
-    st.metric("Total WPA Lost", f"{total_wpa:.1f}%")
-with col4:
-    total_epa = punts['EPA'].sum()
-    st.metric("Total EPA Lost", f"{total_epa:.2f}")
+@st.cache_resource(max_entries=8)
+def get_play_index(fingerprint, _fourth_downs_df):
+    """Relevance index over the plays, built once per dataset"""
+    return PlayIndex(_fourth_downs_df)
 
-st.markdown("---")
+def build_system_prompt(fourth_downs_df, fingerprint, question, conversation=""):
+    """System prompt with the plays most relevant to the question, plus prior turns for follow-ups"""
+    index = get_play_index(fingerprint, fourth_downs_df)
+    league = league_context(get_league_rollup(), question)
+    prompt, report = render_system_prompt(index, question, conversation, top_k=PROMPT_TOP_K,
+                                          token_budget=PROMPT_TOKEN_BUDGET, league=league)
+    st.session_state.last_prompt_report = report
+    return prompt
+
+def cache_question(question, conversation=""):
+    """Follow-ups are only interchangeable when asked after the same conversation"""
+    return f"{conversation}\n\nUser question: {question}" if conversation else question
+
+def stream_ai_response(question, fourth_downs_df, fingerprint, conversation=""):
+    """Yield the answer token by token; the full text is cached once complete.
+
+    `fingerprint` is the one loaded with the plays, so a chat turn never re-hashes the frame.
+    """
+    
+    cache = get_answer_cache()
+    key_question = cache_question(question, conversation)
+    cached = cache.get(key_question, fingerprint, CORTEX_MODEL, ANTHROPIC_MODEL, record=False)
+    if cached is None and not conversation:
+        cached = similar_answer(question, fingerprint)
+    # One hit or miss per question, whether the exact or a near-duplicate lookup answered it
+    cache.record(cached is not None)
+    if cached is not None:
+        yield cached
+        return
+    
+    # Identical questions on the same data share one in-flight stream
+    flight_key = make_key(key_question, fingerprint, "*")
+    try:
+        yield from get_single_flight().stream(
+            flight_key, lambda: stream_from_backends(question, fourth_downs_df, fingerprint, conversation)
+        )
+    except FlightInterrupted as e:
+        # The session leading this flight went away mid-answer; what was shared is incomplete
+        yield f"\n\n*Stream interrupted: {str(e)[:100]}*"
+
+def stream_from_backends(question, fourth_downs_df, fingerprint, conversation=""):
+    """Stream from Cortex, hedged to Anthropic when the first token is slow, then bound Cortex SQL; caches the full text"""
+    
+    system_prompt = build_system_prompt(fourth_downs_df, fingerprint, question, conversation)
+    full_prompt = f"{system_prompt}\n\nUser question: {question}"
+    
+    # Backends stream on the client's worker threads; session state is only touched here
+    client = get_llm_client()
+    streams = {}
+    round_trips = {}
+    pool = get_connection_pool()
+    if pool:
+        def stream_cortex_answer():
+            with track_round_trips() as trips, pool.connection() as conn:
+                record_round_trip("cortex inference:complete")
+                try:
+                    yield from stream_cortex(conn, CORTEX_MODEL, full_prompt, timeout=client.timeouts["cortex"])
+                finally:
+                    round_trips["cortex"] = trips.count
+        streams["cortex"] = stream_cortex_answer
+    api_key = optional_secret("ANTHROPIC_API_KEY")
+    if api_key:
+        def stream_anthropic_answer():
+            return stream_anthropic(api_key, ANTHROPIC_MODEL, system_prompt, question,
+                                    timeout=client.timeouts["anthropic"])
+        streams["anthropic"] = stream_anthropic_answer
+    if pool:
+        def complete_cortex_answer():
+            # Last resort when the REST endpoint is unreachable: one bound COMPLETE statement, not streamed
+            with track_round_trips() as trips, pool.connection() as conn:
+                try:
+                    answer = complete_cortex(conn, CORTEX_MODEL, full_prompt)
+                finally:
+                    round_trips["cortex-sql"] = trips.count
+            if answer:
+                yield answer
+        streams["cortex-sql"] = complete_cortex_answer
+    if not streams:
+        yield "Cortex error: Snowflake not connected"
+        return
+    
+    # Cortex first; Anthropic is hedged in if Cortex is slow to its first token, failing or circuit-broken,
+    # and Cortex over SQL after that. Throttle slots are taken by the client, so queueing never counts
+    # against a backend's breaker or latency.
+    throttles = get_throttles()
+    slots = {name: throttles["anthropic" if name == "anthropic" else "cortex"].slot for name in streams}
+    chunks = []
+    backend = None
+    try:
+        for backend, chunk in client.stream(streams, slots):
+            chunks.append(chunk)
+            yield chunk
+    except BackendUnavailable as e:
+        yield "\n\n".join(f"{name.title()} error: {str(error)[:100]}" for name, error in e.errors.items())
+        return
+    except Exception as e:
+        yield f"\n\n*Stream interrupted: {str(e)[:100]}*"
+        return
+    
+    if backend in round_trips:
+        st.session_state.last_round_trips = round_trips[backend]
+    remember_answer(question, fingerprint, ANTHROPIC_MODEL if backend == "anthropic" else CORTEX_MODEL,
+                    "".join(chunks), conversation)
 
 # ============================================
-# TABS: All content in tabs to avoid scrolling
+# CACHE WARM-UP
 # ============================================
-tab_home, tab_data, tab_analysis = st.tabs(["🏠 Overview", "📊 All 4th Downs", "📈 Analysis"])
+@st.cache_resource
+def start_cache_warmup(fingerprint, _plays):
+    """Precompute example and popular answers once per dataset on a background thread; returns live status"""
+    warmup_config = optional_secret("warmup", {})
+    pool = get_connection_pool()
+    if not pool or not warmup_config.get("enabled", True):
+        return {"state": "skipped"}
+    cache = get_answer_cache()
+    # Resolved here: warmed prompts carry the same league section as build_system_prompt
+    rollup = get_league_rollup()
+    status = {"state": "running"}
+    
+    def run():
+        try:
+            questions = warm_questions(cache, int(warmup_config.get("top_n", 20)))
+            status.update(warm_up(
+                _plays, pool, cache, questions, model=CORTEX_MODEL, models=(CORTEX_MODEL, ANTHROPIC_MODEL),
+                top_k=PROMPT_TOP_K, token_budget=PROMPT_TOKEN_BUDGET, question_index=get_question_index(),
+                rollup=rollup,
+            ))
+            status["state"] = "done"
+        except Exception as e:
+            status.update(state="failed", error=str(e)[:200])
+    
+    threading.Thread(target=run, name="cache-warmup", daemon=True).start()
+    return status
 
-with tab_home:
-    # Two columns: AI Chat on left, Key Play on right
-    chat_col, play_col = st.columns([1, 1])
+# ============================================
+# PANELS (fragments rerun on their own widgets without re-executing the page)
+# ============================================
+CHAT_PAGE_SIZE = 10
 
-    # ============================================
-    # LEFT: AI CHAT
-    # ============================================
-    with chat_col:
-        st.subheader("🤖 Ask About the Game")
-        st.caption("Powered by Snowflake Cortex")
-        
-        # Initialize chat history
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-        
-        # Display chat history
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-        
-        # Example questions
-        st.caption("Try asking:")
-        example_cols = st.columns(2)
-        with example_cols[0]:
-            if st.button("What was the worst decision?", use_container_width=True):
-                st.session_state.pending_question = "What was the worst 4th down decision and why?"
-        with example_cols[1]:
-            if st.button("Should they have gone for it?", use_container_width=True):
-                st.session_state.pending_question = "Should the Patriots have gone for it on 4th & 1?"
-        
-        # Chat input
-        question = st.chat_input("Ask about Patriots' 4th down decisions...")
-        
-        # Handle pending question from button click
-        if "pending_question" in st.session_state:
-            question = st.session_state.pending_question
-            del st.session_state.pending_question
-        
-        if question:
-            # Add user message
-            st.session_state.messages.append({"role": "user", "content": question})
-            with st.chat_message("user"):
-                st.markdown(question)
-            
-            # Get AI response
-            with st.chat_message("assistant"):
-                with st.spinner("Analyzing with Cortex..."):
-                    response = get_ai_response(question, fourth_downs)
-                    st.markdown(response)
-            
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
-
-    # ============================================
-    # RIGHT: THE KEY PLAY
-    # ============================================
-    with play_col:
-        st.subheader("🔥 The Key Play")
-        
-        # Highlight box
-        st.error("**4th & 1 from own 41, down 12-0 in Q3 → PUNT**")
-        
-        key_play = fourth_downs[fourth_downs['YARDS_TO_GO'] == 1].iloc[0]
+@st.fragment
+def chat_panel(fourth_downs, fingerprint):
+    started = time.perf_counter()
+    fourth_downs, fingerprint = current_plays(fourth_downs, fingerprint)
+    st.subheader("🤖 Ask About the Game")
+    st.caption("Powered by Snowflake Cortex")
+    
+    # Initialize chat history
+    if "chat" not in st.session_state:
+        st.session_state.chat = ChatHistory()
+    chat = st.session_state.chat
+    
+    # Older turns are paged inside an expander; only the recent window is always rendered
+    older = chat.older_count()
+    if older:
+        with st.expander(f"{older} earlier messages"):
+            pages = -(-older // CHAT_PAGE_SIZE)
+            page = st.number_input("Page (1 = most recent)", 1, pages, 1, key="chat_page") - 1 if pages > 1 else 0
+            for message in chat.older_page(page, CHAT_PAGE_SIZE):
+                st.markdown(f"**{message['role'].title()}:** {message['content']}")
+    
+    # Display recent chat history
+    for message in chat.recent():
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+    
+    # Example questions
+    st.caption("Try asking:")
+    example_cols = st.columns(len(EXAMPLE_QUESTIONS))
+    for example_col, (label, example) in zip(example_cols, EXAMPLE_QUESTIONS.items()):
+        with example_col:
+            if st.button(label, use_container_width=True):
+                st.session_state.pending_question = example
+    
+    # Chat input
+    question = st.chat_input("Ask about Patriots' 4th down decisions...")
+    
+    # Handle pending question from button click
+    canned = False
+    if "pending_question" in st.session_state:
+        question = st.session_state.pending_question
+        del st.session_state.pending_question
+        canned = True
+    
+    if question:
+        # Prior turns within the token budget, older ones summarized. Example questions
+        # stand alone, so they hit the warmed cache no matter what was asked before.
+        conversation = "" if canned else chat.context()
+        if not conversation:
+            get_answer_cache().log_question(question)
         
-        kp_col1, kp_col2 = st.columns(2)
-        with kp_col1:
-            st.metric("Win Prob Before", f"{key_play['WIN_PROB_PCT']:.1f}%")
-            st.metric("NFL 4th & 1 Conv Rate", "72%")
-        with kp_col2:
-            st.metric("WPA from Punt", f"{key_play['WPA_PCT']:.1f}%", delta="Lost", delta_color="inverse")
-            st.metric("Decision", "PUNT 👎")
+        # Add user message
+        chat.add("user", question)
+        with st.chat_message("user"):
+            st.markdown(question)
         
-        st.markdown("""
-        **The Math:**
-        - Go for it: 72% convert → keep drive alive
-        - Even if fail: SEA gets ball at NE 41
-        - Punt: SEA gets ball at ~SEA 15
+        # Stream AI response; first token replaces the spinner
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_ai_response(question, fourth_downs, fingerprint, conversation))
         
-        **Net field position gain from punt: ~44 yards**  
-        **Not worth giving up 72% chance to convert!**
-        """)
+        chat.add("assistant", response)
+    st.session_state.rerun_ms["chat"] = (time.perf_counter() - started) * 1000
 
-with tab_data:
+def top_play(fingerprint, plays):
+    """(costliest 4th down or None, next costliest in its game)"""
+    key_plays = get_key_plays(fingerprint, plays)
+    key_play = key_plays.key_play()
+    runners_up = key_plays.top(key_play['GAME_ID']).iloc[1:4] if key_play is not None else plays.iloc[:0]
+    return key_play, runners_up
+
+@live_fragment
+def header_panel(fourth_downs, fingerprint):
+    fourth_downs, fingerprint = current_plays(fourth_downs, fingerprint)
+    game = get_live_game()
+    # Live totals are kept per play; otherwise metrics are derived once per dataset
+    metrics = game.totals.metrics() if game is not None else header_metrics(fingerprint, fourth_downs)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("4th Down Punts", metrics['punts'])
+    with col2:
+        st.metric("Bad/Questionable", metrics['bad_decisions'])
+    with col3:
+        st.metric("Total WPA Lost", f"{metrics['total_wpa']:.1f}%")
+    with col4:
+        st.metric("Total EPA Lost", f"{metrics['total_epa']:.2f}")
+    if game is not None:
+        st.caption(f"🔴 Live · {len(fourth_downs)} 4th downs · last play {time.time() - game.updated_at:.0f}s ago")
+
+@live_fragment
+def waiting_for_plays():
+    """Shown until there is a 4th down; reruns the page once the feed delivers one"""
+    if get_live_game() is None:
+        st.info("No 4th downs in the loaded data")
+        return
+    st.info("Waiting for the first 4th down from the live feed...")
+    if not current_plays()[0].empty:
+        st.rerun()
+
+@live_fragment
+def key_play_panel(fourth_downs, fingerprint):
+    fourth_downs, fingerprint = current_plays(fourth_downs, fingerprint)
+    key_play, runners_up = top_play(fingerprint, fourth_downs)
+    st.subheader("🔥 The Key Play")
+    if key_play is None:
+        st.info("No 4th downs in the loaded data")
+        return
+    
+    # Highlight box
+    st.error(f"**{describe_play(key_play)}**")
+    
+    own_team, opp_team = key_play['POSTEAM'], key_play['DEFTEAM']
+    
+    kp_col1, kp_col2 = st.columns(2)
+    with kp_col1:
+        st.metric("Win Prob Before", f"{key_play['WIN_PROB_PCT']:.1f}%")
+        st.metric(f"NFL 4th & {key_play['YARDS_TO_GO']} Conv Rate", f"{key_play['CONV_PROB']:.0%}")
+    with kp_col2:
+        st.metric(f"WPA from {key_play['ACTUAL_DECISION'].title()}", f"{key_play['WPA_PCT']:.1f}%",
+                  delta="Lost" if key_play['WPA_PCT'] < 0 else "Gained",
+                  delta_color="inverse" if key_play['WPA_PCT'] < 0 else "normal")
+        thumb = "👎" if key_play['ACTUAL_DECISION'] != key_play['BEST_DECISION'] else "👍"
+        st.metric("Decision", f"{key_play['ACTUAL_DECISION'].upper()} {thumb}")
+    
+    spot = format_field_position(key_play['YARDLINE_OWN'], own_team, opp_team)
+    punt_spot = format_field_position(key_play['PUNT_OPP_YARDLINE'], opp_team, own_team)
+    if key_play['BEST_DECISION'] == "go":
+        verdict = f"Not worth giving up {key_play['CONV_PROB']:.0%} chance to convert!"
+    else:
+        verdict = f"Model prefers: {key_play['BEST_DECISION'].upper()}"
+    
+    st.markdown(f"""
+    **The Math:**
+    - Go for it: {key_play['CONV_PROB']:.0%} convert → keep drive alive (WP {key_play['WP_GO']:.1f}%)
+    - Even if fail: {opp_team} gets ball at {spot}
+    - Punt: {opp_team} gets ball at ~{punt_spot} (WP {key_play['WP_PUNT']:.1f}%)
+    
+    **Net field position gain from punt: ~{key_play['PUNT_NET_YARDS']:.0f} yards**  
+    **{verdict}**
+    """)
+    
+    sims = simulate_play(key_play)
+    st.caption(
+        f"Simulated {SIM_COUNT:,} games: " + " · ".join(
+            f"{decision.upper()} {result['wp']:.1f}% ({result['ci_low']:.1f}–{result['ci_high']:.1f})"
+            for decision, result in sims.items()
+        )
+    )
+    rollup = get_league_rollup()
+    if rollup is not None and len(rollup):
+        situation = rollup.summary(
+            [], DISTANCE=str(distance_bucket(np.array([key_play['YARDS_TO_GO']]))[0]),
+            FIELD=str(field_bucket(key_play.to_frame().T)[0]),
+            SCORE_STATE=str(score_bucket(np.array([key_play['SCORE_DIFFERENTIAL']]))[0]),
+        ).iloc[0]
+        if situation['PLAYS']:
+            st.caption(
+                f"League in this situation: went for it {situation['GO_RATE']:.0%} of {int(situation['PLAYS']):,} plays; "
+                f"the model says go {situation['GO_ADVISED_RATE']:.0%}"
+            )
+    if len(runners_up):
+        st.caption("Next costliest calls this game: " + " · ".join(
+            f"Q{play['QUARTER']} {play['TIME']} 4th & {play['YARDS_TO_GO']} → {play['ACTUAL_DECISION'].upper()}"
+            for _, play in runners_up.iterrows()
+        ))
+
+PAGE_SIZES = [25, 50, 100]
+
+@live_fragment
+def data_tab(fourth_downs, fingerprint):
+    fourth_downs, fingerprint = current_plays(fourth_downs, fingerprint)
     st.header("All Patriots 4th Down Decisions")
+    table = get_play_table(fingerprint, fourth_downs)
+    
+    # Filters, sort and paging run server-side; the browser only receives the visible page
+    filter_cols = st.columns(4)
+    filters = {}
+    for filter_col, (name, label) in zip(filter_cols, [("team", "Team"), ("quarter", "Quarter"),
+                                                       ("grade", "Grade"), ("distance", "Distance")]):
+        with filter_col:
+            filters[name] = st.multiselect(label, table.options[name], key=f"table_{name}")
     
-    display_df = fourth_downs.copy()
-    display_df['SITUATION'] = 'Q' + display_df['QUARTER'].astype(str) + ' ' + display_df['TIME'].astype(str)
-    display_df['DOWN_DIST'] = '4th & ' + display_df['YARDS_TO_GO'].astype(str)
-    display_df['SCORE'] = display_df['NE_SCORE'].astype(int).astype(str) + '-' + display_df['SEA_SCORE'].astype(int).astype(str)
+    sort_col, order_col, size_col, page_col = st.columns(4)
+    with sort_col:
+        sort = st.selectbox("Sort by", table.sorts, key="table_sort")
+    with order_col:
+        ascending = st.toggle("Ascending", value=True, key="table_ascending")
+    with size_col:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key="table_page_size")
     
-    show_cols = ['SITUATION', 'DOWN_DIST', 'FIELD_POSITION', 'SCORE', 
-                 'WIN_PROB_PCT', 'WPA_PCT', 'EPA', 'GRADE']
+    started = time.perf_counter()
+    rows = table.matching(filters, sort, ascending)
+    total = len(rows)
+    pages = max(-(-total // page_size), 1)
+    # Narrower filters can leave the remembered page past the end
+    if st.session_state.get("table_page", 1) > pages:
+        st.session_state.table_page = pages
+    with page_col:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="table_page") - 1
+    page_df = table.page(rows, page, page_size)
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    elapsed = (time.perf_counter() - started) * 1000
     
-    st.dataframe(display_df[show_cols], use_container_width=True, hide_index=True)
+    first = page * page_size + 1 if total else 0
+    st.caption(
+        f"Rows {first}–{page * page_size + len(page_df)} of {total:,} ({len(table):,} plays) · "
+        f"page payload {payload_bytes(page_df) / 1024:.1f} KB · {elapsed:.0f} ms"
+    )
 
-with tab_analysis:
+def league_comparison(team):
+    """Team vs league go rates by distance, read from the rollup cube"""
+    rollup = get_league_rollup()
+    if rollup is None or not len(rollup):
+        return
+    st.subheader(f"📊 {team} vs League")
+    teams = rollup.team_summary()
+    row = teams[teams['POSTEAM'] == team]
+    if len(row):
+        row = row.iloc[0]
+        st.metric("WP given up per game", f"{row['WP_COST_PER_GAME']:.1f}%",
+                  help=f"Rank {int(row['RANK'])} of {len(teams)} teams (1 = most WP given up)")
+    compare = rollup.compare(team).set_index('DISTANCE').reindex(['short', 'medium', 'long']).dropna(how='all')
+    st.dataframe(
+        (compare[['GO_RATE_TEAM', 'GO_RATE_LEAGUE', 'GO_ADVISED_RATE_LEAGUE']] * 100).round(0).rename(columns={
+            'GO_RATE_TEAM': f'{team} go %', 'GO_RATE_LEAGUE': 'League go %', 'GO_ADVISED_RATE_LEAGUE': 'Model go %',
+        }),
+        use_container_width=True,
+    )
+    seasons = rollup.summary(['SEASON'])
+    if len(seasons) > 1:
+        st.line_chart(seasons.set_index('SEASON')['GO_RATE'] * 100, height=150)
+        st.caption(f"League go rate on 4th down by season · {len(rollup.game_ids):,} games")
+
+@live_fragment
+def analysis_tab(fourth_downs, fingerprint):
+    fourth_downs, fingerprint = current_plays(fourth_downs, fingerprint)
+    key_play, _ = top_play(fingerprint, fourth_downs)
     st.header("Decision Analysis")
+    view = analysis_view(fingerprint, fourth_downs)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.subheader("Win Probability Trend")
-        chart_df = fourth_downs.copy()
-        chart_df['Play #'] = range(1, len(chart_df) + 1)
-        st.bar_chart(chart_df.set_index('Play #')['WIN_PROB_PCT'])
+        st.subheader("Win Probability Timeline")
+        games = list(view['teams'])
+        game_id = games[0]
+        if len(games) > 1:
+            # Open on the game with the top-ranked play
+            default = str(key_play['GAME_ID']) if key_play is not None else game_id
+            game_id = st.selectbox("Game", games, key="timeline_game",
+                                   index=games.index(default) if default in games else 0)
+        teams = view['teams'][game_id]
+        team = teams[0]
+        if len(teams) > 1:
+            default = str(key_play['POSTEAM']) if key_play is not None else team
+            team = st.radio("Win probability for", teams, horizontal=True, key="timeline_team",
+                            index=teams.index(default) if default in teams else 0)
+        line, markers = wp_timeline(fingerprint, game_id, team, fourth_downs)
+        st.altair_chart(timeline_chart(line, markers), use_container_width=True)
         st.caption("Win probability dropped with each conservative punt")
     
     with col2:
         st.subheader("Decision Grades")
-        grade_counts = fourth_downs['GRADE'].value_counts()
+        grade_counts = view['grade_counts']
         
         gcol1, gcol2, gcol3 = st.columns(3)
         with gcol1:
@@ -640,6 +1034,162 @@ with tab_analysis:
             st.metric("🟡 Questionable", grade_counts.get('🟡 QUESTIONABLE', 0))
         with gcol3:
             st.metric("✅ OK", grade_counts.get('✅ OK', 0))
+        
+        league_comparison(team)
+    
+    st.subheader("🎲 Simulated Outcomes: The Key Play")
+    if key_play is None:
+        return
+    sims = simulate_play(key_play)
+    sim_df = pd.DataFrame(sims).T
+    sim_df.index = sim_df.index.str.upper()
+    sim_col1, sim_col2 = st.columns(2)
+    with sim_col1:
+        st.bar_chart(sim_df['wp'])
+    with sim_col2:
+        st.dataframe(
+            sim_df[['wp', 'ci_low', 'ci_high', 'margin_p10', 'margin_p50', 'margin_p90']].rename(columns={
+                'wp': 'Win %', 'ci_low': '95% CI low', 'ci_high': '95% CI high',
+                'margin_p10': 'Margin p10', 'margin_p50': 'Margin p50', 'margin_p90': 'Margin p90',
+            }).round(1),
+            use_container_width=True,
+        )
+    st.caption(f"{SIM_COUNT:,} seeded simulations per decision, rest of game played out drive by drive")
+
+@st.fragment(run_every=HEALTH_PROBE_SECONDS)
+def sidebar_status(warmup_status):
+    # Connection status
+    status_col, refresh_col = st.columns([4, 1])
+    with status_col:
+        st.subheader("🔌 Status")
+    with refresh_col:
+        # Chat turns only rerun the chat panel, so these numbers refresh here or on the next page run
+        st.button("↻", key="refresh_status", help="Refresh status")
+    # Probed in the background; rendering only reads the last result
+    health = get_health_monitor().snapshot()
+    snowflake = health.get("snowflake")
+    if snowflake is None:
+        st.error("Snowflake: Not connected")
+    elif snowflake["ok"] is None:
+        st.info("Snowflake: Checking...")
+    elif snowflake["ok"]:
+        st.success(f"Snowflake: Connected ({snowflake['latency'] * 1000:.0f} ms, {probe_age(snowflake)})")
+    else:
+        st.error(f"Snowflake: Not connected ({probe_age(snowflake)})")
+    
+    cortex = health.get("cortex")
+    if cortex is not None and cortex["ok"] is not None:
+        if cortex["ok"] and get_llm_client().available("cortex"):
+            st.caption(f"Cortex {CORTEX_MODEL}: available ({cortex['latency'] * 1000:.0f} ms)")
+        elif cortex["ok"]:
+            st.caption(f"Cortex {CORTEX_MODEL}: paused after repeated failures")
+        else:
+            st.caption(f"Cortex {CORTEX_MODEL}: unavailable")
+    
+    cache_stats = get_answer_cache().stats()
+    st.caption(
+        f"Answer cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['entries']} stored)"
+    )
+    shared = get_shared_cache()
+    if shared is not None:
+        shared_stats = shared.stats()
+        st.caption(f"Shared cache ({shared_stats['backend']}): {shared_stats['hits']} frame hits / "
+                   f"{shared_stats['misses']} misses")
+    if warmup_status["state"] == "done":
+        st.caption(
+            f"Warm-up: {warmup_status['warmed']} answers precomputed, "
+            f"{warmup_status['already_cached']} already cached ({warmup_status['seconds']:.1f}s)"
+        )
+    elif warmup_status["state"] in ("running", "failed"):
+        st.caption(f"Warm-up: {warmup_status['state']}")
+    question_index = get_question_index()
+    if question_index.matches:
+        st.caption(f"Near-duplicate questions answered from cache: {question_index.matches}")
+    if "last_round_trips" in st.session_state:
+        st.caption(f"Snowflake round trips, last answer: {st.session_state.last_round_trips}")
+    flights = get_single_flight()
+    if flights.followers:
+        st.caption(f"Coalesced requests: {flights.followers} shared {flights.leaders} backend calls")
+    latency_stats = get_llm_client().stats()
+    if latency_stats:
+        with st.expander("⏱️ Backend latency"):
+            for name, stats in latency_stats.items():
+                if stats["count"]:
+                    st.caption(
+                        f"**{name}** ({stats['state']}): p50 {stats['p50']:.1f}s · "
+                        f"p95 {stats['p95']:.1f}s · p99 {stats['p99']:.1f}s · {stats['errors']} errors"
+                    )
+                else:
+                    st.caption(f"**{name}** ({stats['state']}): no successful calls · {stats['errors']} errors")
+    if "last_prompt_report" in st.session_state:
+        report = st.session_state.last_prompt_report
+        st.caption(
+            f"Prompt context: {report['plays_included']}/{report['plays_total']} plays, "
+            f"~{report['context_tokens']} tokens (full table ~{report['full_table_tokens']})"
+        )
+    timings = st.session_state.rerun_ms
+    if "page" in timings:
+        st.caption(f"Last rerun: page {timings['page']:.0f} ms · chat {timings.get('chat', 0):.0f} ms")
+
+# ============================================
+# LOAD DATA
+# ============================================
+fourth_downs, fingerprint = get_graded_plays()
+# A live frame changes with every play, so only static datasets are warmed
+warmup_status = start_cache_warmup(fingerprint, fourth_downs) if get_live_game() is None else {"state": "skipped"}
+
+# Wall time of the last full page run vs the last chat-only fragment run
+if "rerun_ms" not in st.session_state:
+    st.session_state.rerun_ms = {}
+
+# ============================================
+# HEADER WITH DARK MODE TOGGLE
+# ============================================
+header_col1, header_col2 = st.columns([4, 1])
+
+with header_col1:
+    st.title("🏈 Super Bowl LX: 4th Down Analysis")
+    
+with header_col2:
+    st.session_state.dark_mode = st.toggle("🌙", value=st.session_state.dark_mode, help="Dark/Light Mode")
+
+st.markdown("### Seahawks 29 - Patriots 13")
+st.markdown("*Why conservative play-calling cost New England the game*")
+
+# ============================================
+# HOME SCREEN: AI CHAT + KEY STATS
+# ============================================
+
+if fourth_downs.empty:
+    waiting_for_plays()
+    st.stop()
+
+# Top row: Key metrics
+header_panel(fourth_downs, fingerprint)
+
+st.markdown("---")
+
+# ============================================
+# TABS: All content in tabs to avoid scrolling
+# ============================================
+tab_home, tab_data, tab_analysis = st.tabs(["🏠 Overview", "📊 All 4th Downs", "📈 Analysis"])
+
+with tab_home:
+    # Two columns: AI Chat on left, Key Play on right
+    chat_col, play_col = st.columns([1, 1])
+
+    with chat_col:
+        chat_panel(fourth_downs, fingerprint)
+
+    with play_col:
+        key_play_panel(fourth_downs, fingerprint)
+
+with tab_data:
+    data_tab(fourth_downs, fingerprint)
+
+with tab_analysis:
+    analysis_tab(fourth_downs, fingerprint)
 
 # ============================================
 # SIDEBAR
@@ -662,27 +1212,21 @@ with st.sidebar:
     - **WPA** - Win Prob Added
     - **EPA** - Expected Points Added
     
-    **Grades:**
-    - 🔴 Should have gone for it
-    - 🟡 Borderline / questionable
-    - ✅ Reasonable decision
+    **Grades** (model WP lost vs best option):
+    - 🔴 1.25%+ win probability given up
+    - 🟡 0.5–1.25%, borderline
+    - ✅ Within 0.5% of the best call
     """)
     
     st.markdown("---")
     
-    # Connection status
-    st.subheader("🔌 Status")
-    try:
-        conn = get_snowflake_connection()
-        if conn:
-            st.success("Snowflake: Connected")
-        else:
-            st.error("Snowflake: Not connected")
-    except:
-        st.error("Snowflake: Error")
+    sidebar_status(warmup_status)
     
     st.markdown("---")
+    st.caption(f"Plays in memory: {len(fourth_downs):,} rows, {plays_memory(fingerprint, fourth_downs) / 1024:,.0f} KB")
     st.caption("Data: nflfastR | AI: Snowflake Cortex")
 
 st.markdown("---")
 st.caption("Built with Streamlit + Snowflake Cortex")
+
+st.session_state.rerun_ms["page"] = (time.perf_counter() - run_started) * 1000
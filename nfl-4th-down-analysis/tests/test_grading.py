@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from grading import DEFAULT_GRADE, grade_decision, grade_fourth_downs, validate_rules
+
+
+def row_wise(df):
+    return df.apply(grade_decision, axis=1) if len(df.columns) else pd.Series(DEFAULT_GRADE, index=df.index)
+
+
+def assert_matches(df):
+    pd.testing.assert_series_equal(grade_fourth_downs(df), row_wise(df), check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_frames_match_row_wise(seed):
+    rng = np.random.default_rng(seed)
+    n = 2_000
+    df = pd.DataFrame({
+        "PUNT_ATTEMPT": rng.integers(0, 2, n),
+        "YARDS_TO_GO": rng.integers(1, 15, n),
+        "SCORE_DIFFERENTIAL": rng.integers(-28, 29, n),
+        "WPA_PCT": rng.normal(0, 4, n).round(1),
+    })
+    assert_matches(df)
+
+
+def test_nan_inputs_match_row_wise():
+    df = pd.DataFrame({
+        "PUNT_ATTEMPT": [1, 1, 1, 1],
+        "YARDS_TO_GO": [np.nan, 1, 1, 3],
+        "SCORE_DIFFERENTIAL": [-14, np.nan, -14, -10],
+        "WPA_PCT": [-5.0, -5.0, np.nan, np.nan],
+    })
+    assert_matches(df)
+
+
+def test_threshold_values_match_row_wise():
+    # Every combination of values on and either side of each rule's cut-off
+    combos = itertools.product([0, 1], [0, 1, 2, 3, 4, 5], [-11, -10, -9, -8, -7, -6, 0], [-3.1, -3.0, -2.9])
+    df = pd.DataFrame(list(combos), columns=["PUNT_ATTEMPT", "YARDS_TO_GO", "SCORE_DIFFERENTIAL", "WPA_PCT"])
+    assert_matches(df)
+    on_cutoff = df[(df["PUNT_ATTEMPT"] == 1) & (df["YARDS_TO_GO"] == 1) & (df["SCORE_DIFFERENTIAL"] == -10)]
+    assert (grade_fourth_downs(on_cutoff) == "🔴 TERRIBLE").all()
+    assert (grade_fourth_downs(df[df["PUNT_ATTEMPT"] == 0]) == DEFAULT_GRADE).all()
+
+
+@pytest.mark.parametrize("missing", [
+    ["WPA_PCT"],
+    ["SCORE_DIFFERENTIAL"],
+    ["YARDS_TO_GO", "SCORE_DIFFERENTIAL"],
+    ["PUNT_ATTEMPT"],
+    ["PUNT_ATTEMPT", "YARDS_TO_GO", "SCORE_DIFFERENTIAL", "WPA_PCT"],
+])
+def test_missing_columns_fall_back_like_row_wise(missing):
+    df = pd.DataFrame({
+        "PUNT_ATTEMPT": [1, 1, 1, 0],
+        "YARDS_TO_GO": [1, 2, 4, 1],
+        "SCORE_DIFFERENTIAL": [-10, -7, -9, -14],
+        "WPA_PCT": [-5.0, 0.0, -3.5, -8.0],
+    }).drop(columns=missing)
+    assert_matches(df)
+
+
+def test_empty_frame():
+    df = pd.DataFrame(columns=["PUNT_ATTEMPT", "YARDS_TO_GO", "SCORE_DIFFERENTIAL", "WPA_PCT"])
+    assert grade_fourth_downs(df).empty
+
+
+def test_no_rules_and_custom_defaults():
+    df = pd.DataFrame({"PUNT_ATTEMPT": [1, 0], "YARDS_TO_GO": [1, 1]})
+    assert grade_fourth_downs(df, rules=[]).tolist() == [DEFAULT_GRADE, DEFAULT_GRADE]
+    rules = [{"grade": "🔴 BAD", "when": [("PUNT_ATTEMPT", "==", 1), ("SCORE_DIFFERENTIAL", "<=", -7)]}]
+    assert grade_fourth_downs(df, rules=rules).tolist() == [DEFAULT_GRADE, DEFAULT_GRADE]
+    assert grade_fourth_downs(df, rules=rules, defaults={"SCORE_DIFFERENTIAL": -7}).tolist() == ["🔴 BAD", DEFAULT_GRADE]
+
+
+@pytest.mark.parametrize("rules", [
+    [{"when": []}],
+    [{"grade": "x", "when": [("YARDS_TO_GO", "<=")]}],
+    [{"grade": "x", "when": [("YARDS_TO_GO", "=~", 1)]}],
+])
+def test_malformed_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        validate_rules(rules)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_sources import SampleSource
+from decision_model import MODEL_GRADE_RULES
+from grading import DEFAULT_GRADE_RULES
+from pushdown import compile_rules, parity_check, to_nflfastr
+
+TEAMS = ["NE", "SEA", "KC", "BUF", "DAL", "SF"]
+
+
+def synthetic_pbp(n_games=40, plays_per_game=30, seed=0):
+    """nflfastR-shaped plays with every down, so the pushdown has to filter to 4th downs itself"""
+    rng = np.random.default_rng(seed)
+    n = n_games * plays_per_game
+    game = np.repeat(np.arange(n_games), plays_per_game)
+    home = rng.choice(TEAMS, n_games)
+    away = np.array([rng.choice([t for t in TEAMS if t != h]) for h in home])
+    has_ball = rng.random(n) < 0.5
+    posteam = np.where(has_ball, home[game], away[game])
+    defteam = np.where(has_ball, away[game], home[game])
+    yard = rng.integers(1, 51, n)
+    side = np.where(yard == 50, "MID", np.where(rng.random(n) < 0.5, posteam, defteam))
+    posteam_score = rng.integers(0, 35, n)
+    defteam_score = rng.integers(0, 35, n)
+    punt = rng.random(n) < 0.4
+    wpa = rng.normal(0, 0.03, n)
+    wpa[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({
+        "game_id": [f"2024_{g:02d}_{away[g]}_{home[g]}" for g in game],
+        "season": 2024,
+        "posteam": posteam,
+        "defteam": defteam,
+        "qtr": rng.integers(1, 5, n),
+        "time": [f"{m}:{s:02d}" for m, s in zip(rng.integers(0, 15, n), rng.integers(0, 60, n))],
+        "ydstogo": rng.integers(1, 21, n),
+        "yrdln": [f"{s} {y}" for s, y in zip(side, yard)],
+        "posteam_score": posteam_score,
+        "defteam_score": defteam_score,
+        "score_differential": posteam_score - defteam_score,
+        "play_type": np.where(punt, "punt", rng.choice(["pass", "run", "field_goal"], n)),
+        "wp": rng.uniform(0.01, 0.99, n),
+        "wpa": wpa,
+        "epa": rng.normal(0, 1.5, n),
+        "punt_attempt": punt.astype(int),
+        "desc": "synthetic play",
+        "down": rng.integers(1, 5, n),
+    })
+
+
+def assert_parity(raw, rules):
+    report = parity_check(raw, rules=rules)
+    assert report["plays"][0] == report["plays"][1] > 0
+    assert report["grade_mismatches"] == 0
+    assert report["ok"], report
+
+
+@pytest.mark.parametrize("rules", [MODEL_GRADE_RULES, DEFAULT_GRADE_RULES], ids=["model", "default"])
+def test_sample_parity(rules):
+    assert_parity(to_nflfastr(SampleSource().load()), rules)
+
+
+@pytest.mark.parametrize("rules", [MODEL_GRADE_RULES, DEFAULT_GRADE_RULES], ids=["model", "default"])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_synthetic_parity(rules, seed):
+    assert_parity(synthetic_pbp(seed=seed), rules)
+
+
+def test_compile_rules_uses_defaults_for_missing_columns():
+    sql = compile_rules([{"grade": "x", "when": [("WPA_PCT", "<", -3)]}], columns=["GRADE"])
+    assert sql == "CASE WHEN 0 < -3 THEN 'x' ELSE '✅ OK' END"
+    with pytest.raises(ValueError):
+        compile_rules([{"grade": "x", "when": [("NOT_A_COLUMN", "<", 1)]}], columns=[])
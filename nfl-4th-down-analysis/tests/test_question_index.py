@@ -0,0 +1,78 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from question_index import FEATURE_VERSION, QuestionIndex, same_question, signature
+
+THRESHOLD = 0.75
+STORED = [
+    "What was the worst 4th down decision and why?",
+    "Should the Patriots have gone for it on 4th & 1?",
+    "What was the best call?",
+    "Was the 4th & 2 punt bad?",
+]
+
+
+@pytest.fixture
+def index():
+    index = QuestionIndex(":memory:")
+    for question in STORED:
+        index.add(question, "data")
+    return index
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("worst call?", STORED[0]),
+    ("what was the worst 4th down decision", STORED[0]),
+    ("which punt was worst", STORED[0]),
+    ("Should NE have gone for it on 4th & 1?", STORED[1]),
+    ("should the pats go for it on 4th and 1", STORED[1]),
+    ("What was the best decision?", STORED[2]),
+    ("Was the punt on 4th and 2 a bad call?", STORED[3]),
+])
+def test_paraphrases_match(index, question, expected):
+    match = index.best_match(question, "data", THRESHOLD)
+    assert match is not None and match[0] == expected
+
+
+@pytest.mark.parametrize("question", [
+    "should the patriots go for it on 4th & 2",   # different distance
+    "Should NE have punted on 4th & 1?",          # different decision
+    "Should SEA have gone for it on 4th & 1?",    # different team
+    "Was the 4th & 2 punt good?",                 # opposite verdict
+    "What happened in the 4th quarter?",          # different topic
+])
+def test_different_questions_do_not_match(index, question):
+    assert index.best_match(question, "data", THRESHOLD) is None
+
+
+def test_matches_stay_within_a_dataset(index):
+    assert index.best_match("worst call?", "other data", THRESHOLD) is None
+
+
+def test_signature_gate():
+    assert same_question(signature("worst call?"), signature("which punt was worst"))
+    assert same_question(signature("Patriots worst call"), signature("NE worst call"))
+    assert not same_question(signature("best call"), signature("worst call"))
+    assert not same_question(signature("4th & 1 punt"), signature("4th & 2 punt"))
+    # Lowercase "no" / "was" are words, not the Saints or Washington
+    assert signature("Was it a mistake? No")["teams"] == frozenset()
+    assert same_question(signature("Did Kansas City punt too much?"), signature("Did KC punt too much?"))
+    assert not same_question(signature("Did the Chiefs punt too much?"), signature("Did the Bills punt too much?"))
+
+
+def test_persisted_vectors_are_rebuilt_when_features_change(tmp_path):
+    path = str(tmp_path / "questions.sqlite")
+    QuestionIndex(path).add(STORED[0], "data")
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE questions SET vector = ?", (np.zeros(256, dtype=np.float32).tobytes(),))
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    reopened = QuestionIndex(path)
+    assert len(reopened) == 1
+    assert reopened.best_match("worst call?", "data", THRESHOLD)[0] == STORED[0]
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == FEATURE_VERSION
@@ -0,0 +1,59 @@
+"""
+Win Probability Timeline
+========================
+Per-game WP over game time, downsampled with LTTB to a fixed point budget
+"""
+
+import numpy as np
+import pandas as pd
+
+TIMELINE_POINTS = 300
+
+
+def lttb(x, y, n_out):
+    """Indices of the Largest-Triangle-Three-Buckets downsample of (x, y); keeps first and last points"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket edges over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+    return selected
+
+
+def game_timeline(plays, team, points=TIMELINE_POINTS):
+    """(line, markers) for one game: WP for `team` over elapsed seconds, and its 4th-down decisions"""
+    plays = plays.sort_values("GAME_SECONDS", kind="stable")
+    seconds = plays["GAME_SECONDS"].to_numpy(dtype=float)
+    wp = plays["WIN_PROB_PCT"].to_numpy(dtype=float)
+    # WIN_PROB_PCT is the offense's; flip the opponent's possessions to one team's view
+    wp = np.where(plays["POSTEAM"].astype(str).to_numpy() == team, wp, 100 - wp)
+    keep = lttb(seconds, wp, points)
+    line = pd.DataFrame({"GAME_SECONDS": seconds[keep], "WP": wp[keep]})
+
+    fourth = plays["DOWN"].to_numpy() == 4 if "DOWN" in plays.columns else np.ones(len(plays), dtype=bool)
+    markers = pd.DataFrame({
+        "GAME_SECONDS": seconds[fourth],
+        "WP": wp[fourth],
+        "DECISION": plays["ACTUAL_DECISION"].astype(str).str.upper().to_numpy()[fourth],
+        "GRADE": plays["GRADE"].astype(str).to_numpy()[fourth],
+        "SITUATION": ("Q" + plays["QUARTER"].astype(str) + " " + plays["TIME"].astype(str)
+                      + ", 4th & " + plays["YARDS_TO_GO"].astype(str)).to_numpy()[fourth],
+    })
+    return line, markers
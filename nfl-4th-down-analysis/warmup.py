@@ -0,0 +1,109 @@
+"""
+Answer Cache Warm-up
+====================
+Precompute answers for the example questions and the most-asked questions.
+
+    python warmup.py --secrets .streamlit/secrets.toml --top 20
+"""
+
+import argparse
+import time
+
+from answer_cache import AnswerCache, data_fingerprint, normalize_question
+from context_builder import PlayIndex, system_prompt
+from data_sources import query_from_config, source_from_config
+from decision_model import grade_plays
+from llm import complete_cortex_batch
+from question_index import QuestionIndex
+from rollup import LeagueRollup, league_context
+from schema import normalize_fourth_downs
+from shared_cache import shared_cache_from_config
+from snowflake_pool import pool_from_config
+
+# Button label -> question sent, shown under the chat box
+EXAMPLE_QUESTIONS = {
+    "What was the worst decision?": "What was the worst 4th down decision and why?",
+    "Should they have gone for it?": "Should the Patriots have gone for it on 4th & 1?",
+}
+
+DEFAULT_MODEL = "mistral-large"
+
+
+def warm_questions(cache, top_n=20):
+    """Example questions, then the top-N logged ones, without duplicates"""
+    questions = {}
+    for question in [*EXAMPLE_QUESTIONS.values(), *cache.top_questions(top_n)]:
+        questions.setdefault(normalize_question(question), question)
+    return list(questions.values())
+
+
+def warm_up(plays, pool, cache, questions, model=DEFAULT_MODEL, models=None, top_k=25, token_budget=1500,
+            question_index=None, rollup=None):
+    """Answer every uncached question with batched Cortex queries and store the results.
+
+    Pass the app's league rollup so warmed prompts match live ones.
+    """
+    start = time.monotonic()
+    fingerprint = data_fingerprint(plays)
+    models = models or (model,)
+    missing = [q for q in questions if not cache.has(q, fingerprint, *models)]
+    warmed = 0
+    if missing:
+        index = PlayIndex(plays)
+        prompts = [
+            f"{system_prompt(index, q, top_k=top_k, token_budget=token_budget, league=league_context(rollup, q))[0]}"
+            f"\n\nUser question: {q}"
+            for q in missing
+        ]
+        answers = pool.run(lambda conn: complete_cortex_batch(conn, model, prompts))
+        for question, answer in zip(missing, answers):
+            if answer:
+                cache.put(question, fingerprint, model, answer)
+                if question_index is not None:
+                    question_index.add(question, fingerprint)
+                warmed += 1
+    return {
+        "questions": len(questions),
+        "already_cached": len(questions) - len(missing),
+        "warmed": warmed,
+        "failed": len(missing) - warmed,
+        "seconds": time.monotonic() - start,
+    }
+
+
+def main():
+    import tomllib
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+    pool = pool_from_config(secrets["snowflake"])
+    data_config = secrets.get("data", {})
+    plays = source_from_config(data_config, pool).load(**query_from_config(data_config))
+    plays = grade_plays(normalize_fourth_downs(plays))
+
+    # Warmed answers go to the shared tier too, so every replica serves them
+    cache = AnswerCache(shared=shared_cache_from_config(secrets.get("shared_cache", {})))
+    # Same league section the app adds; the cube is refreshed by rollup.py or the app
+    rollup_config = secrets.get("rollup")
+    rollup = None
+    if rollup_config and rollup_config.get("enabled", True):
+        rollup_source = source_from_config(rollup_config, pool)
+        rollup = LeagueRollup.for_source(rollup_source.cache_key, query_from_config(rollup_config))
+    questions = warm_questions(cache, args.top)
+    result = warm_up(plays, pool, cache, questions, model=args.model, question_index=QuestionIndex(),
+                     rollup=rollup)
+    print(
+        f"{result['questions']} questions: {result['already_cached']} already cached, "
+        f"{result['warmed']} warmed, {result['failed']} failed in {result['seconds']:.1f}s"
+    )
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()